@@ -0,0 +1,213 @@
+"""
+    End-to-end latency of AmpliPi commands, from the service call (or entity method) until Home Assistant's state shows the result
+    Boots a throwaway Home Assistant instance, sets the integration up against an in-process simulator and repeats each operation,
+    alternating its target so that every repetition changes something. An operation counts as confirmed once the state machine
+    agrees with what the simulator now holds. Reports p50/p95/p99 latency and the HTTP requests each operation cost:
+
+        python benchmarks/command_latency.py --iterations 100
+        python benchmarks/command_latency.py --delay 0.03 --jitter 0.02
+
+    Multi-step flows (async_connect_zones_to_stream, swap_source) are driven through the entity methods directly as no service maps onto them
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from collections import Counter
+
+from aiohttp import web
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_platform import async_get_platforms
+
+from harness import DEFAULT_INTEGRATION, prepare_config_dir, start_home_assistant, add_amplipi_entry, amplipi_coordinator
+from simulator import AmpliPiSimulator, make_status
+
+
+async def wait_until(hass: HomeAssistant, predicate, timeout: float):
+    """Wait for the state machine to satisfy predicate, checked again on every state change"""
+    if predicate():
+        return
+    future = hass.loop.create_future()
+
+    @callback
+    def check(event):
+        if not future.done() and predicate():
+            future.set_result(None)
+
+    unsubscribe = hass.bus.async_listen(EVENT_STATE_CHANGED, check)
+    try:
+        await asyncio.wait_for(future, timeout)
+    finally:
+        unsubscribe()
+
+
+def attribute(hass: HomeAssistant, entity_id: str, name: str):
+    state = hass.states.get(entity_id)
+    return state.attributes.get(name) if state is not None else None
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[round(fraction * (len(ordered) - 1))]
+
+
+class Operations:
+    """Each operation takes the iteration number, performs one command and returns a predicate for when Home Assistant shows its result"""
+
+    def __init__(self, hass: HomeAssistant, simulator: AmpliPiSimulator, coordinator, entities: dict):
+        self.hass = hass
+        self.simulator = simulator
+        self.coordinator = coordinator
+        self.entities = entities
+
+    def _entity_id(self, kind: str, amplipi_id: int) -> str:
+        return self.entities[(kind, amplipi_id)].entity_id
+
+    def _sim(self, kind: str, amplipi_id: int) -> dict:
+        return next(item for item in self.simulator.status[kind] if item["id"] == amplipi_id)
+
+    def _source_of_stream(self, stream_id: int) -> dict:
+        return next(source for source in self.simulator.status["sources"] if source["input"] == f"stream={stream_id}")
+
+    def _shows_source(self, zone_id: int):
+        """The zone entity names the source that the simulator has it connected to"""
+        entity_id = self._entity_id("zone", zone_id)
+        source_id = self._sim("zones", zone_id)["source_id"]
+        return lambda: attribute(self.hass, entity_id, "source") == f"Source {source_id + 1}"
+
+    def _shows_stream(self, source_id: int, stream_id: int):
+        """The source entity names the stream connected to it"""
+        source_entity_id = self._entity_id("source", source_id)
+        stream_entity_id = self._entity_id("stream", stream_id)
+        return lambda: attribute(self.hass, source_entity_id, "source") == attribute(self.hass, stream_entity_id, "friendly_name")
+
+    async def _service(self, service: str, entity_id: str, **data):
+        await self.hass.services.async_call("media_player", service, {"entity_id": entity_id, **data}, blocking=True)
+
+    async def zone_volume_set(self, iteration: int):
+        entity_id = self._entity_id("zone", 0)
+        volume = round(0.2 + 0.4 * (iteration % 2) + 0.01 * (iteration % 10), 2)
+        await self._service("volume_set", entity_id, volume_level=volume)
+        return lambda: attribute(self.hass, entity_id, "volume_level") == volume
+
+    async def group_volume_set(self, iteration: int):
+        entity_id = self._entity_id("group", 100)
+        volume = round(0.2 + 0.4 * (iteration % 2) + 0.01 * (iteration % 10), 2)
+        await self._service("volume_set", entity_id, volume_level=volume)
+        return lambda: attribute(self.hass, entity_id, "volume_level") == volume
+
+    async def zone_select_source(self, iteration: int):
+        stream_id = 1000 + iteration % 2
+        await self._service("select_source", self._entity_id("zone", 1), source=self._entity_id("stream", stream_id))
+        return self._shows_source(1)
+
+    async def source_select_source(self, iteration: int):
+        stream_id = 1002 + iteration % 2
+        await self._service("select_source", self._entity_id("source", 2), source=self._entity_id("stream", stream_id))
+        return self._shows_stream(2, stream_id)
+
+    async def stream_play_pause(self, iteration: int):
+        entity_id = self._entity_id("stream", 1000)
+        service, expected = ("media_pause", "paused") if iteration % 2 == 0 else ("media_play", "playing")
+        await self._service(service, entity_id)
+        return lambda: self.hass.states.get(entity_id).state == expected
+
+    async def connect_zones_to_stream(self, iteration: int):
+        stream = self.coordinator.index.streams[1000 + (iteration + 1) % 2]
+        await self.entities[("zone", 2)].async_connect_zones_to_stream(stream, [2], None)
+        return self._shows_source(2)
+
+    async def swap_source(self, iteration: int):
+        old_source = self._source_of_stream(1001)["id"]
+        await self.entities[("stream", 1001)].swap_source(old_source)
+        return self._shows_stream(self._source_of_stream(1001)["id"], 1001)
+
+
+OPERATIONS = (
+    "zone_volume_set",
+    "group_volume_set",
+    "zone_select_source",
+    "source_select_source",
+    "stream_play_pause",
+    "connect_zones_to_stream",
+    "swap_source",
+)
+
+
+async def run(args) -> dict:
+    simulator = AmpliPiSimulator(make_status(args.zones, args.streams), args.delay, args.jitter, seed=0)
+    site_runner = web.AppRunner(simulator.make_app())
+    await site_runner.setup()
+    await web.TCPSite(site_runner, "127.0.0.1", args.port).start()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as config_dir:
+        prepare_config_dir(config_dir, args.integration)
+        hass = await start_home_assistant(config_dir)
+        entry = await add_amplipi_entry(hass, args.port)
+        coordinator = amplipi_coordinator(hass, entry)
+        entities = {
+            (entity._kind, entity._id): entity
+            for platform in async_get_platforms(hass, "amplipi")
+            for entity in platform.entities.values()
+            if hasattr(entity, "_kind")
+        }
+        operations = Operations(hass, simulator, coordinator, entities)
+
+        # Give every stream that's moved around a source, so that operations only ever change what they're meant to
+        for stream_id, source_id in ((1000, 0), (1001, 1), (1002, 2)):
+            await operations._service("select_source", operations._entity_id("source", source_id), source=operations._entity_id("stream", stream_id))
+        # Zones that are off have no volume, so turn every zone on without connecting it to anything
+        await operations._service("select_source", operations._entity_id("group", 100), source="None")
+        await hass.async_block_till_done()
+
+        for name in args.operations:
+            latencies = []
+            requests: Counter = Counter()
+            for iteration in range(args.iterations):
+                before = Counter(simulator.requests)
+                started = time.perf_counter()
+                confirmed = await getattr(operations, name)(iteration)
+                await wait_until(hass, confirmed, args.timeout)
+                latencies.append(time.perf_counter() - started)
+                # Let anything the command kicked off (ie. a refresh) finish so it isn't counted against the next one
+                await hass.async_block_till_done()
+                requests.update(simulator.requests - before)
+
+            results[name] = {
+                "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+                "requests": round(sum(requests.values()) / args.iterations, 2),
+                "by_route": {route: round(total / args.iterations, 2) for route, total in sorted(requests.items())},
+            }
+
+        await hass.async_stop()
+
+    await site_runner.cleanup()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--integration", default=DEFAULT_INTEGRATION, help="Path of the amplipi integration to load")
+    parser.add_argument("--port", type=int, default=5053)
+    parser.add_argument("--zones", type=int, default=6)
+    parser.add_argument("--streams", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0, help="Seconds the simulator holds every request for")
+    parser.add_argument("--jitter", type=float, default=0, help="Up to this many seconds are added to --delay at random")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=10, help="Seconds to wait for an operation to show up before giving up")
+    parser.add_argument("--operations", nargs="+", choices=OPERATIONS, default=list(OPERATIONS))
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(f"{'operation':>24} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'requests':>9}  by route")
+    for name, result in results.items():
+        routes = ", ".join(f"{route} {total}" for route, total in result["by_route"].items())
+        print(f"{name:>24} {result['p50_ms']:>8} {result['p95_ms']:>8} {result['p99_ms']:>8} {result['requests']:>9}  {routes}")
+
+
+if __name__ == "__main__":
+    main()
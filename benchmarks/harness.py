@@ -0,0 +1,56 @@
+"""
+    Shared setup for the benchmarks that run the integration inside a real, throwaway Home Assistant instance
+"""
+import os
+
+from homeassistant import block_async_io, bootstrap, config_entries, runner
+from homeassistant.const import CONF_HOST, CONF_PORT
+from homeassistant.core import HomeAssistant
+
+DEFAULT_INTEGRATION = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "custom_components", "amplipi")
+
+
+def prepare_config_dir(config_dir: str, integration: str = DEFAULT_INTEGRATION):
+    """Link the integration into a config directory and give it a configuration.yaml that loads nothing else"""
+    custom_components = os.path.join(config_dir, "custom_components")
+    os.makedirs(custom_components, exist_ok=True)
+    link = os.path.join(custom_components, "amplipi")
+    if not os.path.exists(link):
+        os.symlink(os.path.abspath(integration), link)
+    with open(os.path.join(config_dir, "configuration.yaml"), "w") as config:
+        config.write("logger:\n  default: warning\n")
+
+
+async def start_home_assistant(config_dir: str) -> HomeAssistant:
+    """Boot Home Assistant from a config directory, which also sets up any config entries already saved in it"""
+    # Home Assistant only expects to boot once per process and refuses to turn its blocking call detection on a second time,
+    # forget that it's on so that restart.py can boot again after stopping.
+    # _BLOCKED_CALLS is private and was checked against Home Assistant 2025.1.4, if it's gone a second boot may raise instead
+    blocked_calls = getattr(getattr(block_async_io, "_BLOCKED_CALLS", None), "calls", None)
+    if blocked_calls is not None:
+        blocked_calls.clear()
+    hass = await bootstrap.async_setup_hass(runner.RuntimeConfig(config_dir=config_dir, skip_pip=True))
+    await hass.async_start()
+    return hass
+
+
+async def add_amplipi_entry(hass: HomeAssistant, port: int, host: str = "127.0.0.1"):
+    """Run the user config flow against a controller (ie. the simulator) and wait for the entry to finish setting up"""
+    result = await hass.config_entries.flow.async_init(
+        "amplipi",
+        context={"source": config_entries.SOURCE_USER},
+        data={CONF_HOST: host, CONF_PORT: port},
+    )
+    if result.get("type") != "create_entry":
+        raise RuntimeError(f"Could not set up AmpliPi against {host}:{port}: {result}")
+    await hass.async_block_till_done()
+    return result["result"]
+
+
+def amplipi_coordinator(hass: HomeAssistant, entry):
+    """The AmpliPiDataClient of a config entry, read out of hass.data by key so that the integration isn't imported a second time"""
+    return hass.data[entry.domain][entry.entry_id]["amplipi_object"]
+
+
+def amplipi_states(hass: HomeAssistant) -> list:
+    return [state for state in hass.states.async_all("media_player") if state.entity_id.startswith("media_player.amplipi")]
@@ -0,0 +1,116 @@
+"""
+    Parse time and memory per refresh of the coordinator's models, validated against trusted (model_construct) building
+    The coordinator validates, as pydantic's compiled validation beats model_construct here; this keeps the comparison around for new pydantic releases
+    Covers a controller on its own and with expansion units, 6 zones per unit:
+
+        python benchmarks/model_build.py --zones 6 18 36
+
+    Every object is rebuilt on each iteration, which is what a refresh costs when everything changed (ie. the first poll)
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from pyamplipi.models import Status as PyStatus, SourceInfo, Info, FirmwareInfo, Preset
+
+from custom_components.amplipi.coordinator import ENTITY_KINDS
+from custom_components.amplipi.models import Source, Status
+
+from simulator import make_status
+
+
+def build_entity(cls, payload: dict, validate: bool, **ha_fields):
+    """A Source, Zone, Group or Stream as the coordinator builds it, or trusted with only the nested SourceInfo built by hand"""
+    if validate:
+        return cls(**payload, **ha_fields)
+    if cls is Source and payload.get("info") is not None:
+        payload = {**payload, "info": SourceInfo.model_construct(**payload["info"])}
+    return cls.model_construct(**payload, **ha_fields)
+
+
+def build_status(state: dict, validate: bool) -> Status:
+    """The Status as the coordinator builds it, or trusted like build_entity"""
+    if validate:
+        return Status(**state)
+
+    info = state.get("info")
+    if info is not None:
+        if info.get("fw") is not None:
+            info = {**info, "fw": [FirmwareInfo.model_construct(**fw) for fw in info["fw"]]}
+        info = Info.model_construct(**info)
+    return Status.model_construct(
+        sources=state["sources"],
+        zones=state["zones"],
+        groups=state["groups"],
+        streams=state["streams"],
+        # Presets nest several models deep and there are rarely more than a handful of them, so they're validated either way
+        presets=[Preset.model_validate(preset) for preset in state.get("presets", [])],
+        info=info,
+    )
+
+
+def build(payload: dict, validate: bool):
+    """The work set_data does for one refresh: pyamplipi's parse, then every entity and the Status built from the dumped payload"""
+    state = PyStatus.model_validate(payload).model_dump()
+    for key, kind, cls in ENTITY_KINDS:
+        state[key] = [
+            build_entity(
+                cls,
+                entity,
+                validate,
+                original_name=entity["name"],
+                unique_id=f"amplipi_{kind}_{entity['id']}",
+                entity_id=f"media_player.amplipi_{kind}_{entity['id']}",
+                friendly_name=entity["name"],
+                amplipi_kind=kind,
+                amplipi_id=entity["id"],
+            )
+            for entity in state[key]
+        ]
+    return build_status(state, validate)
+
+
+def measure(payload: dict, validate: bool, iterations: int) -> dict:
+    build(payload, validate)  # warm up
+
+    gc.collect()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        build(payload, validate)
+    elapsed = (time.perf_counter() - started) / iterations
+
+    gc.collect()
+    tracemalloc.start()
+    status = build(payload, validate)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del status
+
+    return {"ms": elapsed * 1000, "retained_kib": retained / 1024, "peak_kib": peak / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--zones", type=int, nargs="+", default=[6, 18, 36])
+    parser.add_argument("--streams", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'zones':>5} {'mode':>9} {'ms/refresh':>11} {'retained KiB':>13} {'peak KiB':>9}")
+    for zones in args.zones:
+        payload = make_status(zones, args.streams)
+        if build(payload, True).model_dump() != build(payload, False).model_dump():
+            raise AssertionError(f"Trusted and validated builds differ for {zones} zones")
+
+        for mode, validate in (("validated", True), ("trusted", False)):
+            result = measure(payload, validate, args.iterations)
+            print(f"{zones:>5} {mode:>9} {result['ms']:>11.3f} {result['retained_kib']:>13.1f} {result['peak_kib']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
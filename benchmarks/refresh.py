@@ -0,0 +1,221 @@
+"""
+    Time and memory of each stage of a coordinator refresh, measured on a real AmpliPiDataClient and its media player entities
+    Boots a throwaway Home Assistant instance per configuration, sets the integration up against an in-process simulator and then repeats:
+
+        fetch: GET /api over the coordinator's own connection pool, up to the raw body
+        decode: json.loads of that body
+        validate: pyamplipi's Status model_validate and the model_dump that set_data is handed
+        enrich: set_data with every object rebuilt, what a refresh costs when everything changed (ie. the first poll)
+        fan_out: the coordinator notifying every entity, including each one syncing and writing its state
+
+    The stages don't overlap, so they add up to a whole refresh. How much of fan_out each entity class's sync_state and state account for
+    is measured on a separate pass and reported alongside, not as a stage of its own.
+
+    Runs 6, 18, 36 and 72 zones (a controller with 0, 2, 5 and 11 expansion units) against 10 and 200 streams by default, and compares
+    against the baseline committed in benchmarks/baselines/refresh.json. Absolute times depend on the machine, so every stage is compared
+    as a multiple of the reference stage, pyamplipi's own validate, which runs over the same payload but isn't the integration's code.
+    The run exits with an error if any stage's multiple grew by more than --tolerance:
+
+        python benchmarks/refresh.py
+
+    After a change that is meant to move the numbers, save a new baseline and commit it:
+
+        python benchmarks/refresh.py --save-baseline
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from statistics import median
+
+from aiohttp import web
+from homeassistant.helpers.entity_platform import async_get_platforms
+
+from pyamplipi.models import Status as PyStatus
+
+from harness import DEFAULT_INTEGRATION, prepare_config_dir, start_home_assistant, add_amplipi_entry, amplipi_coordinator
+from simulator import AmpliPiSimulator, make_status
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "refresh.json")
+
+STAGES = ("fetch", "decode", "validate", "enrich", "fan_out")
+
+# Stage the others are compared against, see compare
+REFERENCE_STAGE = "validate"
+
+
+async def run_stages(coordinator, url: str, entities: list) -> tuple[dict, dict]:
+    """One refresh split into its stages, returns the seconds each stage took and the seconds spent per entity class within fan_out"""
+    timings = {}
+    per_class: dict[str, float] = defaultdict(float)
+
+    started = time.perf_counter()
+    async with coordinator.http_session.get(url) as response:
+        body = await response.read()
+    timings["fetch"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    payload = json.loads(body)
+    timings["decode"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    state = PyStatus.model_validate(payload).model_dump()
+    timings["validate"] = time.perf_counter() - started
+
+    # Every object is rebuilt rather than found unchanged
+    coordinator.invalidate_built()
+    started = time.perf_counter()
+    status = await coordinator.set_data(state, publish=False)
+    timings["enrich"] = time.perf_counter() - started
+
+    coordinator.data = status
+    coordinator.affected = None
+    started = time.perf_counter()
+    coordinator.async_update_listeners()
+    timings["fan_out"] = time.perf_counter() - started
+
+    # The same work every entity did during fan_out, repeated one entity at a time to split it up by class
+    for entity in entities:
+        started = time.perf_counter()
+        entity.sync_state()
+        entity._current_state()
+        per_class[type(entity).__name__] += time.perf_counter() - started
+
+    return timings, per_class
+
+
+async def measure(coordinator, url: str, entities: list, iterations: int) -> dict:
+    await run_stages(coordinator, url, entities)  # warm up
+
+    samples: dict[str, list[float]] = defaultdict(list)
+    class_samples: dict[str, list[float]] = defaultdict(list)
+    gc.collect()
+    for _ in range(iterations):
+        timings, per_class = await run_stages(coordinator, url, entities)
+        for stage, seconds in timings.items():
+            samples[stage].append(seconds)
+        for name, seconds in per_class.items():
+            class_samples[name].append(seconds)
+
+    # Allocations are measured on a separate refresh since tracing them slows everything else down
+    gc.collect()
+    tracemalloc.start()
+    await run_stages(coordinator, url, entities)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Medians rather than means, so that the odd refresh held up by a garbage collection doesn't move the comparison with the baseline
+    return {
+        "ms": {stage: round(median(samples[stage]) * 1000, 3) for stage in STAGES},
+        "entity_classes_ms": {name: round(median(seconds) * 1000, 3) for name, seconds in sorted(class_samples.items())},
+        "peak_kib": round(peak / 1024, 1),
+        "entities": len(entities),
+    }
+
+
+async def run_configuration(args, config_dir: str, zones: int, streams: int) -> dict:
+    simulator = AmpliPiSimulator(make_status(zones, streams))
+    site_runner = web.AppRunner(simulator.make_app())
+    await site_runner.setup()
+    await web.TCPSite(site_runner, "127.0.0.1", args.port).start()
+
+    hass = await start_home_assistant(config_dir)
+    entry = await add_amplipi_entry(hass, args.port)
+
+    coordinator = amplipi_coordinator(hass, entry)
+    entities = [
+        entity
+        for platform in async_get_platforms(hass, "amplipi")
+        if platform.config_entry is not None and platform.config_entry.entry_id == entry.entry_id
+        for entity in platform.entities.values()
+        if hasattr(entity, "sync_state")
+    ]
+
+    result = await measure(coordinator, f"http://127.0.0.1:{args.port}/api/", entities, args.iterations)
+    # The next configuration boots from the same config directory, so leave it without an entry (or a snapshot) for it to find
+    await hass.config_entries.async_remove(entry.entry_id)
+    await hass.async_stop()
+
+    await site_runner.cleanup()
+    return result
+
+
+def relative(result: dict) -> dict:
+    """Each stage's time as a multiple of the reference stage's, which cancels out how fast the machine running the benchmark is"""
+    reference = result["ms"][REFERENCE_STAGE]
+    return {stage: ms / reference for stage, ms in result["ms"].items() if stage != REFERENCE_STAGE}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Every stage whose multiple of the reference stage grew by more than tolerance (a fraction) over the baseline's"""
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        before = relative(baseline[key])
+        for stage, ratio in relative(result).items():
+            if stage in before and ratio > before[stage] * (1 + tolerance):
+                regressions.append(f"{key} {stage}: {before[stage]:.2f}x -> {ratio:.2f}x {REFERENCE_STAGE}")
+    return regressions
+
+
+async def run(args) -> dict:
+    results = {}
+    # Home Assistant imports custom integrations from the first config directory it boots from, so every configuration shares one
+    with tempfile.TemporaryDirectory() as config_dir:
+        prepare_config_dir(config_dir, args.integration)
+        for streams in args.streams:
+            for zones in args.zones:
+                results[f"{zones} zones, {streams} streams"] = await run_configuration(args, config_dir, zones, streams)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--integration", default=DEFAULT_INTEGRATION, help="Path of the amplipi integration to load")
+    parser.add_argument("--port", type=int, default=5052)
+    parser.add_argument("--zones", type=int, nargs="+", default=[6, 18, 36, 72])
+    parser.add_argument("--streams", type=int, nargs="+", default=[10, 200])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline to compare against and/or save to")
+    parser.add_argument("--save-baseline", action="store_true", help="Save this run as the baseline instead of comparing against it")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="How much slower than the baseline a stage may get relative to the reference stage, as a fraction")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    print(f"{'configuration':>24} {'entities':>8} " + " ".join(f"{stage:>9}" for stage in STAGES) + f" {'peak KiB':>10}")
+    for key, result in results.items():
+        print(f"{key:>24} {result['entities']:>8} " + " ".join(f"{result['ms'][stage]:>9.3f}" for stage in STAGES) + f" {result['peak_kib']:>10.1f}")
+    print("\nms of fan_out per refresh by entity class:")
+    for key, result in results.items():
+        print(f"{key:>24} " + ", ".join(f"{name} {ms:.3f}" for name, ms in result["entity_classes_ms"].items()))
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+            baseline_file.write("\n")
+        print(f"\nSaved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}, run with --save-baseline to create one")
+        sys.exit(1)
+
+    with open(args.baseline) as baseline_file:
+        regressions = compare(results, json.load(baseline_file), args.tolerance)
+    if regressions:
+        print("\nSlower than the baseline:\n" + "\n".join(regressions))
+        sys.exit(1)
+    print(f"\nNo stage is more than {args.tolerance:.0%} slower than the baseline, relative to {REFERENCE_STAGE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+    Measures how long a Home Assistant restart takes to bring AmpliPi entities back, with and without the status snapshot
+    Sets the integration up once against an in-process simulator that holds every request for --delay seconds (a busy or distant controller),
+    stops Home Assistant so that the snapshot is written, then boots it again from the same config directory and times:
+
+        entities: from the start of the boot until the amplipi media players exist
+        available: from the start of the boot until they are no longer unavailable, ie. the first live poll has landed
+
+        python benchmarks/restart.py --delay 2
+        python benchmarks/restart.py --delay 2 --no-cache
+"""
+import argparse
+import asyncio
+import glob
+import os
+import tempfile
+import time
+
+from aiohttp import web
+from homeassistant.const import STATE_UNAVAILABLE
+
+from harness import DEFAULT_INTEGRATION, prepare_config_dir, start_home_assistant, add_amplipi_entry, amplipi_states
+from simulator import AmpliPiSimulator, make_status
+
+
+async def wait_for(predicate, timeout: float = 60, interval: float = 0.01):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError("Gave up waiting on Home Assistant")
+        await asyncio.sleep(interval)
+
+
+async def run(args) -> dict:
+    simulator = AmpliPiSimulator(make_status(args.zones, args.streams))
+    site_runner = web.AppRunner(simulator.make_app())
+    await site_runner.setup()
+    await web.TCPSite(site_runner, "127.0.0.1", args.port).start()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as config_dir:
+        prepare_config_dir(config_dir, args.integration)
+
+        hass = await start_home_assistant(config_dir)
+        await add_amplipi_entry(hass, args.port)
+        expected = len(amplipi_states(hass))
+        # Stopping flushes any pending snapshot write along with the rest of .storage
+        await hass.async_stop()
+
+        if args.no_cache:
+            for path in glob.glob(os.path.join(config_dir, ".storage", "amplipi.*")):
+                os.remove(path)
+
+        simulator.delay = args.delay
+        simulator.requests.clear()
+        started = time.monotonic()
+        hass = await start_home_assistant(config_dir)
+        await wait_for(lambda: len(amplipi_states(hass)) >= expected)
+        results["entities (s)"] = round(time.monotonic() - started, 3)
+        await wait_for(lambda: all(state.state != STATE_UNAVAILABLE for state in amplipi_states(hass)))
+        results["available (s)"] = round(time.monotonic() - started, 3)
+        results["entities"] = expected
+        await hass.async_stop()
+
+    await site_runner.cleanup()
+    return {
+        **results,
+        **{route: total for route, total in simulator.requests.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--integration", default=DEFAULT_INTEGRATION, help="Path of the amplipi integration to load")
+    parser.add_argument("--port", type=int, default=5051)
+    parser.add_argument("--zones", type=int, default=6)
+    parser.add_argument("--streams", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=2, help="Seconds the simulator holds every request for during the timed boot")
+    parser.add_argument("--no-cache", action="store_true", help="Delete the status snapshot before the timed boot")
+    args = parser.parse_args()
+
+    for name, value in asyncio.run(run(args)).items():
+        print(f"{name:>40}: {value}")
+
+
+if __name__ == "__main__":
+    main()
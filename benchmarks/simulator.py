@@ -0,0 +1,251 @@
+"""
+    Local stand-in for an AmpliPi controller's /api endpoints
+    Covers everything pyamplipi calls on behalf of the integration: status, sources, zones, groups, streams and their play/pause/next/prev/stop
+    commands, announce and play_media. Lets the integration be pointed at a machine without AmpliPi hardware:
+
+        python benchmarks/simulator.py --port 5000 --expansion-units 2 --delay 0.05 --jitter 0.02 --error-rate 0.01
+
+    and then add an AmpliPi integration with host 127.0.0.1 and port 5000
+"""
+import argparse
+import asyncio
+import json
+import random
+from collections import Counter
+
+from aiohttp import web
+
+RCA_STREAM_IDS = [996, 997, 998, 999]
+
+# Zones on the main unit, each expansion unit adds as many again
+ZONES_PER_UNIT = 6
+
+# Stream commands and the source state they leave behind
+STREAM_COMMANDS = {"play": "playing", "pause": "paused", "stop": "stopped", "next": "playing", "prev": "playing"}
+# Commands a source offers while it's playing a stream that isn't an RCA input
+STREAM_SUPPORTED_CMDS = ["play", "pause", "stop"]
+
+
+def zones_for(expansion_units: int) -> int:
+    return ZONES_PER_UNIT * (1 + expansion_units)
+
+
+def make_status(zones: int = ZONES_PER_UNIT, streams: int = 4) -> dict:
+    """Build a GET /api payload for a controller with the given number of zones (see zones_for) and (non-RCA) streams"""
+    return {
+        "sources": [
+            {
+                "id": source_id,
+                "name": f"Input {source_id + 1}",
+                "input": "None",
+                "info": {"name": "None", "state": "stopped", "supported_cmds": []},
+            }
+            for source_id in range(4)
+        ],
+        "zones": [
+            {
+                "id": zone_id,
+                "name": f"Zone {zone_id + 1}",
+                "source_id": -2,
+                "mute": True,
+                "vol": -80,
+                "vol_f": 0.0,
+                "vol_min": -80,
+                "vol_max": 0,
+                "disabled": False,
+            }
+            for zone_id in range(zones)
+        ],
+        "groups": [
+            {
+                "id": 100,
+                "name": "All Zones",
+                "source_id": -2,
+                "zones": list(range(zones)),
+                "mute": True,
+                "vol_delta": -80,
+                "vol_f": 0.0,
+            }
+        ],
+        "streams": [
+            {"id": stream_id, "name": f"Input {index + 1}", "type": "rca"}
+            for index, stream_id in enumerate(RCA_STREAM_IDS)
+        ] + [
+            {"id": 1000 + index, "name": f"Internet Radio {index + 1}", "type": "internetradio"}
+            for index in range(streams)
+        ],
+        "presets": [],
+        "info": {"version": "0.4.7", "config_file": "house.json", "mock_ctrl": True, "mock_streams": True},
+    }
+
+
+class AmpliPiSimulator:
+    """In-memory controller state plus the aiohttp routes that serve and modify it"""
+
+    def __init__(self, status: dict, delay: float = 0, jitter: float = 0, error_rate: float = 0, seed: int = None):
+        self.status = status
+        # Seconds that every request is held for before being answered, to stand in for a slow controller, plus up to jitter seconds more
+        self.delay = delay
+        self.jitter = jitter
+        # Fraction of requests that are answered with a 500 instead
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        # Requests served so far, by method and route, and how many of those were failed on purpose
+        self.requests: Counter = Counter()
+        self.errors: Counter = Counter()
+
+    @web.middleware
+    async def _count_requests(self, request: web.Request, handler):
+        route = f"{request.method} {request.match_info.route.resource.canonical}"
+        self.requests[route] += 1
+        delay = self.delay + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.errors[route] += 1
+            return web.json_response({"detail": "Simulated controller error"}, status=500)
+        return await handler(request)
+
+    def make_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._count_requests])
+        app.router.add_get("/api", self.get_status)
+        app.router.add_get("/api/", self.get_status)
+        app.router.add_get("/api/info", self.get_info)
+        for kind in ("sources", "zones", "groups", "streams", "presets"):
+            app.router.add_get(f"/api/{kind}", self.get_all)
+            app.router.add_get(f"/api/{kind}/{{id}}", self.get_one)
+        app.router.add_patch("/api/sources/{id}", self.patch_source)
+        app.router.add_patch("/api/zones", self.patch_zones)
+        app.router.add_patch("/api/zones/{id}", self.patch_zone)
+        app.router.add_patch("/api/groups/{id}", self.patch_group)
+        app.router.add_patch("/api/streams/{id}", self.patch_stream)
+        app.router.add_post("/api/streams/{id}/{command}", self.stream_command)
+        app.router.add_post("/api/announce", self.announce)
+        app.router.add_post("/api/play", self.play_media)
+        return app
+
+    def _find(self, kind: str, request: web.Request) -> dict:
+        item_id = int(request.match_info["id"])
+        item = next((item for item in self.status[kind] if item["id"] == item_id), None)
+        if item is None:
+            raise web.HTTPNotFound(text=json.dumps({"detail": f"{kind} {item_id} not found"}), content_type="application/json")
+        return item
+
+    async def get_status(self, request: web.Request) -> web.Response:
+        return web.json_response(self.status)
+
+    async def get_info(self, request: web.Request) -> web.Response:
+        return web.json_response(self.status["info"])
+
+    async def get_all(self, request: web.Request) -> web.Response:
+        kind = request.path.rstrip("/").rsplit("/", 1)[-1]
+        return web.json_response({kind: self.status[kind]})
+
+    async def get_one(self, request: web.Request) -> web.Response:
+        return web.json_response(self._find(request.path.split("/")[2], request))
+
+    async def patch_source(self, request: web.Request) -> web.Response:
+        source = self._find("sources", request)
+        source.update({key: value for key, value in (await request.json()).items() if key in ("name", "input")})
+        # A stream starts playing as soon as it's connected, and the source offers whatever commands the stream supports
+        stream = next((stream for stream in self.status["streams"] if source["input"] == f"stream={stream['id']}"), None)
+        if stream is None or stream["id"] in RCA_STREAM_IDS:
+            source["info"] = {"name": "None", "state": "stopped", "supported_cmds": []}
+        else:
+            source["info"] = {"name": stream["name"], "state": "playing", "supported_cmds": STREAM_SUPPORTED_CMDS}
+        return self.changed()
+
+    async def patch_zone(self, request: web.Request) -> web.Response:
+        self._find("zones", request).update(await request.json())
+        return self.changed()
+
+    async def patch_zones(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        zone_ids = set(body.get("zones") or [])
+        for group in self.status["groups"]:
+            if group["id"] in (body.get("groups") or []):
+                zone_ids.update(group["zones"])
+        for zone in self.status["zones"]:
+            if zone["id"] in zone_ids:
+                zone.update(body["update"])
+        return self.changed()
+
+    async def patch_group(self, request: web.Request) -> web.Response:
+        group = self._find("groups", request)
+        body = await request.json()
+        group.update({key: value for key, value in body.items() if key in ("name", "zones")})
+        # Everything else is applied to the member zones, the group's own values are worked out from theirs
+        update = {key: value for key, value in body.items() if key in ("source_id", "mute", "vol_f")}
+        for zone in self.status["zones"]:
+            if zone["id"] in group["zones"]:
+                zone.update(update)
+        return self.changed()
+
+    async def patch_stream(self, request: web.Request) -> web.Response:
+        self._find("streams", request).update(await request.json())
+        return self.changed()
+
+    async def stream_command(self, request: web.Request) -> web.Response:
+        stream = self._find("streams", request)
+        state = STREAM_COMMANDS.get(request.match_info["command"])
+        if state is None:
+            raise web.HTTPBadRequest(text=json.dumps({"detail": "Unknown command"}), content_type="application/json")
+        for source in self.status["sources"]:
+            if source["input"] == f"stream={stream['id']}":
+                source["info"] = {**source["info"], "state": state}
+        return self.changed()
+
+    async def announce(self, request: web.Request) -> web.Response:
+        # Announcements play over the top of whatever is on and leave everything as it was
+        await request.json()
+        return web.json_response(self.status)
+
+    async def play_media(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        source = next((source for source in self.status["sources"] if source["id"] == body.get("source_id", 0)), None)
+        if source is not None:
+            source["info"] = {**source["info"], "name": body["media"], "track": body["media"], "state": "playing"}
+        return self.changed()
+
+    def _update_groups(self):
+        """Groups report the source, mute and volume of their member zones, with no source where the members disagree"""
+        zones = {zone["id"]: zone for zone in self.status["zones"]}
+        for zone in zones.values():
+            # The integration only ever sets vol_f, keep the dB volume in step with it
+            zone["vol"] = round(zone["vol_min"] + zone["vol_f"] * (zone["vol_max"] - zone["vol_min"]))
+        for group in self.status["groups"]:
+            members = [zones[zone_id] for zone_id in group["zones"] if zone_id in zones]
+            if not members:
+                continue
+            source_ids = {zone["source_id"] for zone in members}
+            group["source_id"] = source_ids.pop() if len(source_ids) == 1 else None
+            group["mute"] = all(zone["mute"] for zone in members)
+            group["vol_f"] = round(sum(zone["vol_f"] for zone in members) / len(members), 2)
+            group["vol_delta"] = round(sum(zone["vol"] for zone in members) / len(members))
+
+    def changed(self) -> web.Response:
+        """Answer a write with the new status, like the real controller does"""
+        self._update_groups()
+        return web.json_response(self.status)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--expansion-units", type=int, default=0, help=f"Expansion units connected to the main unit, each adding {ZONES_PER_UNIT} zones")
+    parser.add_argument("--zones", type=int, help="Number of zones, instead of working it out from --expansion-units")
+    parser.add_argument("--streams", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0, help="Seconds to hold every request for")
+    parser.add_argument("--jitter", type=float, default=0, help="Up to this many seconds are added to --delay at random")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of requests answered with a 500")
+    parser.add_argument("--seed", type=int, help="Seed for the jitter and errors, for repeatable runs")
+    args = parser.parse_args()
+
+    zones = args.zones if args.zones is not None else zones_for(args.expansion_units)
+    simulator = AmpliPiSimulator(make_status(zones, args.streams), args.delay, args.jitter, args.error_rate, args.seed)
+    web.run_app(simulator.make_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
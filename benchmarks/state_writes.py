@@ -0,0 +1,96 @@
+"""
+    Counts the state writes that AmpliPi entities make per minute
+    Boots a throwaway Home Assistant instance, sets the integration up against an in-process simulator
+    (4 sources and 6 zones by default), and counts state_changed and state_reported events from amplipi media players:
+
+        python benchmarks/state_writes.py --minutes 2
+
+    To compare against an older revision, check it out into a worktree and point --integration at that copy of the integration:
+
+        git worktree add /tmp/amplipi-before <revision>
+        python benchmarks/state_writes.py --integration /tmp/amplipi-before/custom_components/amplipi
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from collections import Counter
+
+from aiohttp import web
+from homeassistant.const import EVENT_STATE_CHANGED, EVENT_STATE_REPORTED
+from homeassistant.core import callback
+
+from harness import DEFAULT_INTEGRATION, prepare_config_dir, start_home_assistant, add_amplipi_entry
+from simulator import AmpliPiSimulator, make_status
+
+
+async def change_zones(simulator: AmpliPiSimulator, every: float):
+    """Nudge the volume of a random zone every so often, as if someone was using the AmpliPi web app"""
+    while True:
+        await asyncio.sleep(every)
+        zone = random.choice(simulator.status["zones"])
+        zone["vol_f"] = round(random.random(), 2)
+
+
+async def run(args) -> dict:
+    simulator = AmpliPiSimulator(make_status(args.zones, args.streams))
+    site_runner = web.AppRunner(simulator.make_app())
+    await site_runner.setup()
+    await web.TCPSite(site_runner, "127.0.0.1", args.port).start()
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        prepare_config_dir(config_dir, args.integration)
+        hass = await start_home_assistant(config_dir)
+
+        writes: Counter = Counter()
+
+        @callback
+        def is_amplipi(event_data) -> bool:
+            return event_data["entity_id"].startswith("media_player.amplipi")
+
+        def count(event):
+            writes[event.event_type] += 1
+
+        # Home Assistant refuses state_reported listeners without an event filter
+        hass.bus.async_listen(EVENT_STATE_CHANGED, count, event_filter=is_amplipi)
+        hass.bus.async_listen(EVENT_STATE_REPORTED, count, event_filter=is_amplipi)
+
+        await add_amplipi_entry(hass, args.port)
+
+        # Only measure steady state, not entities being added
+        writes.clear()
+        simulator.requests.clear()
+        changer = asyncio.create_task(change_zones(simulator, args.change_every)) if args.change_every else None
+        started = time.monotonic()
+        await asyncio.sleep(args.minutes * 60)
+        elapsed_minutes = (time.monotonic() - started) / 60
+        if changer:
+            changer.cancel()
+
+        await hass.async_stop()
+
+    await site_runner.cleanup()
+    return {
+        "state writes/min": round(sum(writes.values()) / elapsed_minutes, 1),
+        **{f"{event_type}/min": round(total / elapsed_minutes, 1) for event_type, total in writes.items()},
+        **{f"{route}/min": round(total / elapsed_minutes, 1) for route, total in simulator.requests.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--integration", default=DEFAULT_INTEGRATION, help="Path of the amplipi integration to load")
+    parser.add_argument("--port", type=int, default=5050)
+    parser.add_argument("--zones", type=int, default=6)
+    parser.add_argument("--streams", type=int, default=4)
+    parser.add_argument("--minutes", type=float, default=1)
+    parser.add_argument("--change-every", type=float, default=10, help="Seconds between simulated zone changes, 0 for a quiet system")
+    args = parser.parse_args()
+
+    for name, value in asyncio.run(run(args)).items():
+        print(f"{name:>40}: {value}")
+
+
+if __name__ == "__main__":
+    main()
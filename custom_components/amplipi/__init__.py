@@ -4,24 +4,71 @@ from __future__ import annotations
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_HOST, CONF_PORT, CONF_NAME, CONF_ID
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.typing import ConfigType
+from homeassistant.util import slugify
+import homeassistant.helpers.config_validation as cv
 import logging
+from .config_flow import manual_unique_id
+from .connection import create_session
 from .coordinator import AmpliPiDataClient
+from .profiler import async_setup_services
+from .scheduler import PollStagger
+from .snapshot import StatusSnapshot
 
-from .const import DOMAIN, AMPLIPI_OBJECT, CONF_VENDOR, CONF_VERSION, CONF_WEBAPP, CONF_API_PATH
+from .const import DOMAIN, AMPLIPI_OBJECT, CONF_VENDOR, CONF_VERSION, CONF_WEBAPP, CONF_API_PATH, CONF_COMMAND_LATENCY, DEFAULT_COMMAND_LATENCY, COMMAND_TIMEOUT, CONF_ENTITY_PREFIX, POLL_STAGGER
 
-PLATFORMS = ["media_player"]
+PLATFORMS = ["media_player", "sensor"]
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
 _LOGGER = logging.getLogger(__name__)
 
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Register the integration's services, which act on every loaded controller"""
+    async_setup_services(hass)
+    return True
+
+
+def _async_assign_ids(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """
+        Give entries from before multiple controllers were supported a stable unique_id, and every entry a prefix for its entities\n
+        The first controller keeps the plain DOMAIN prefix so that its existing entity ids, automations and dashboards carry on working
+    """
+    data = dict(entry.data)
+    unique_id = entry.unique_id
+    if not unique_id:
+        unique_id = data[CONF_ID] = manual_unique_id(data[CONF_HOST], data[CONF_PORT])
+
+    if CONF_ENTITY_PREFIX not in data:
+        taken = {
+            other.data[CONF_ENTITY_PREFIX]
+            for other in hass.config_entries.async_entries(DOMAIN)
+            if other.entry_id != entry.entry_id and CONF_ENTITY_PREFIX in other.data
+        }
+        data[CONF_ENTITY_PREFIX] = DOMAIN if DOMAIN not in taken else f"{DOMAIN}_{slugify(data[CONF_HOST])}"
+
+    if unique_id != entry.unique_id or data != entry.data:
+        hass.config_entries.async_update_entry(entry, unique_id=unique_id, data=data)
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    _async_assign_ids(hass, entry)
+
+    http_session = create_session()
+    entry.async_on_unload(http_session.close)
+
     coordinator = AmpliPiDataClient(
             hass=hass,
             config_entry=entry,
             logger=_LOGGER,
             endpoint=f'http://{entry.data[CONF_HOST]}:{entry.data[CONF_PORT]}/api/',
-            timeout=10,
-            http_session=async_get_clientsession(hass)
+            timeout=COMMAND_TIMEOUT,
+            http_session=http_session,
+            command_latency=entry.options.get(CONF_COMMAND_LATENCY, DEFAULT_COMMAND_LATENCY),
+            entity_prefix=entry.data[CONF_ENTITY_PREFIX],
+            # One stagger for every controller, so that they aren't all polled at the same moment
+            stagger=hass.data.setdefault(POLL_STAGGER, PollStagger()),
         )
     
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
@@ -36,11 +83,26 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         CONF_API_PATH: entry.data[CONF_API_PATH],
     }
 
+    # Start from the last run's snapshot when there is one so that setup doesn't wait on the controller, otherwise fetch the status first
+    fast_start = await coordinator.async_load_snapshot()
+    if not fast_start:
+        await coordinator.async_config_entry_first_refresh()
+
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    if fast_start:
+        entry.async_create_background_task(hass, coordinator.async_refresh(), "amplipi_first_refresh")
+
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
     return True
 
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
@@ -48,3 +110,8 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         hass.data[DOMAIN].pop(entry.entry_id)
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the status snapshot of a removed config entry."""
+    await StatusSnapshot(hass, entry.entry_id).async_remove()
@@ -0,0 +1,179 @@
+"""
+    Command coalescing and batching for the AmpliPi data coordinator
+    Merges rapid-fire updates aimed at the same zone or group (ie. dragging a volume slider) so that only the latest values are sent,
+    and combines identical updates aimed at different zones and groups (ie. a scene) into a single request
+"""
+import asyncio
+from collections import defaultdict
+from typing import Awaitable, Callable, Hashable, Optional, TypeVar
+
+from homeassistant.core import HomeAssistant
+
+from pyamplipi.models import ZoneUpdate, MultiZoneUpdate
+
+T = TypeVar("T")
+
+
+def merge_zone_updates(earlier: ZoneUpdate, later: ZoneUpdate) -> ZoneUpdate:
+    """Combine two updates for the same target, fields set by the later update win"""
+    return ZoneUpdate(**{**earlier.model_dump(exclude_unset=True), **later.model_dump(exclude_unset=True)})
+
+
+class _PendingUpdate:
+    __slots__ = ("update", "send", "future")
+
+    def __init__(self, update: ZoneUpdate, send: Callable[[ZoneUpdate], Awaitable[T]], future: asyncio.Future):
+        self.update = update
+        self.send = send
+        self.future = future
+
+
+class ZoneUpdateCoalescer:
+    """
+        Holds each ZoneUpdate for up to `latency` seconds, merging any further updates for the same target into it before it is sent\n
+        Sends to the same target never overlap, and every caller whose update was merged gets the result of the request that carried it
+    """
+
+    def __init__(self, hass: HomeAssistant, latency: float):
+        self._hass = hass
+        self.latency = latency
+        self._pending: dict[Hashable, _PendingUpdate] = {}
+        # Targets whose first update arrived during the current tick, they share one timer so that they're also sent in the same tick
+        self._due: Optional[list[Hashable]] = None
+        # Lock per target along with how many sends are holding or waiting on it, dropped once nothing is
+        self._locks: dict[Hashable, asyncio.Lock] = {}
+        self._lock_users: defaultdict[Hashable, int] = defaultdict(int)
+
+        # Counters for diagnostics
+        self.submitted: int = 0
+        self.sent: int = 0
+
+    async def submit(self, key: Hashable, update: ZoneUpdate, send: Callable[[ZoneUpdate], Awaitable[T]]) -> T:
+        """Queue an update for the target identified by key, send is called with the merged update once the latency budget runs out"""
+        self.submitted += 1
+        if self.latency <= 0:
+            return await self._send(key, update, send)
+
+        pending: Optional[_PendingUpdate] = self._pending.get(key)
+        if pending is None:
+            pending = _PendingUpdate(update, send, self._hass.loop.create_future())
+            self._pending[key] = pending
+            self._schedule(key)
+        else:
+            pending.update = merge_zone_updates(pending.update, update)
+
+        return await asyncio.shield(pending.future)
+
+    def _schedule(self, key: Hashable) -> None:
+        """
+            Flush the target latency seconds from now
+
+            Separate timers started in the same tick can still fire in different ticks, which would keep the batcher from combining what
+            they send, so every target that comes due in the same tick is flushed by the same timer
+        """
+        if self._due is None:
+            self._due = []
+            self._hass.loop.call_later(self.latency, self._flush, self._due)
+            self._hass.loop.call_soon(self._close_tick)
+        self._due.append(key)
+
+    def _close_tick(self) -> None:
+        self._due = None
+
+    def _flush(self, keys: list[Hashable]) -> None:
+        for key in keys:
+            pending = self._pending.pop(key)
+            self._hass.async_create_task(self._resolve(key, pending), eager_start=True)
+
+    async def _resolve(self, key: Hashable, pending: _PendingUpdate) -> None:
+        try:
+            pending.future.set_result(await self._send(key, pending.update, pending.send))
+        except Exception as e:  # pylint: disable=broad-except
+            pending.future.set_exception(e)
+
+    async def _send(self, key: Hashable, update: ZoneUpdate, send: Callable[[ZoneUpdate], Awaitable[T]]) -> T:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._lock_users[key] += 1
+        try:
+            async with lock:
+                self.sent += 1
+                return await send(update)
+        finally:
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                del self._locks[key]
+
+    def diagnostics(self) -> dict:
+        return {
+            "latency": self.latency,
+            "submitted": self.submitted,
+            "sent": self.sent,
+            "pending": len(self._pending),
+        }
+
+
+class _PendingBatch:
+    __slots__ = ("update", "zones", "groups", "future")
+
+    def __init__(self, update: ZoneUpdate, future: asyncio.Future):
+        self.update = update
+        self.zones: list[int] = []
+        self.groups: list[int] = []
+        self.future = future
+
+
+class ZoneUpdateBatcher:
+    """
+        Collects identical ZoneUpdates aimed at different zones and groups within one event loop tick and sends them as one MultiZoneUpdate\n
+        Service calls that target several entities at once run every entity's method in the same tick, so they end up in the same batch
+    """
+
+    def __init__(self, hass: HomeAssistant, send: Callable[[MultiZoneUpdate], Awaitable[T]]):
+        self._hass = hass
+        self._send = send
+        self._pending: dict[str, _PendingBatch] = {}
+
+        # Counters for diagnostics
+        self.submitted: int = 0
+        self.sent: int = 0
+
+    async def submit(self, update: ZoneUpdate, zones: Optional[list[int]] = None, groups: Optional[list[int]] = None) -> T:
+        """Queue an update for the given zones and groups, it is sent along with every identical update queued in the same tick"""
+        self.submitted += 1
+        key = update.model_dump_json(exclude_unset=True)
+        batch: Optional[_PendingBatch] = self._pending.get(key)
+        if batch is None:
+            batch = _PendingBatch(update, self._hass.loop.create_future())
+            self._pending[key] = batch
+            self._hass.loop.call_soon(self._flush, key)
+
+        batch.zones.extend(zone for zone in zones or () if zone not in batch.zones)
+        batch.groups.extend(group for group in groups or () if group not in batch.groups)
+        return await asyncio.shield(batch.future)
+
+    def _flush(self, key: str) -> None:
+        batch = self._pending.pop(key)
+        self._hass.async_create_task(self._resolve(batch), eager_start=True)
+
+    async def _resolve(self, batch: _PendingBatch) -> None:
+        self.sent += 1
+        try:
+            batch.future.set_result(await self._send(
+                MultiZoneUpdate(
+                    zones=batch.zones or None,
+                    groups=batch.groups or None,
+                    update=batch.update,
+                )
+            ))
+        except Exception as e:  # pylint: disable=broad-except
+            batch.future.set_exception(e)
+
+    def diagnostics(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "sent": self.sent,
+            "pending": len(self._pending),
+        }
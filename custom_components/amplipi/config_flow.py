@@ -5,7 +5,6 @@ import asyncio
 import logging
 from typing import Any
 
-import async_timeout
 import voluptuous as vol
 from aiohttp import ClientError, ClientSession
 from homeassistant import config_entries, exceptions, data_entry_flow
@@ -16,11 +15,16 @@ from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers.typing import DiscoveryInfoType
 from pyamplipi.amplipi import AmpliPi
 
-from .const import DOMAIN, CONF_VENDOR, CONF_VERSION, CONF_WEBAPP, CONF_API_PATH
+from .const import DOMAIN, CONF_VENDOR, CONF_VERSION, CONF_WEBAPP, CONF_API_PATH, CONF_COMMAND_LATENCY, DEFAULT_COMMAND_LATENCY, SETUP_TIMEOUT
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def manual_unique_id(host: str, port: int) -> str:
+    """AmpliPi doesn't report a distinct identifier of its own, so controllers added by hand are told apart by where they're reached"""
+    return f"{host}:{port}"
+
+
 async def async_retrieve_info(hass, host, port):
     """Validate the user input allows us to connect."""
     session: ClientSession = async_get_clientsession(hass)
@@ -28,10 +32,10 @@ async def async_retrieve_info(hass, host, port):
     _LOGGER.info("Attempting to retrieve AmpliPi details")
 
     try:
-        with async_timeout.timeout(5000):
+        async with asyncio.timeout(SETUP_TIMEOUT):
             client = AmpliPi(
                 f"http://{host}:{port}/api/",
-                10,
+                SETUP_TIMEOUT,
                 session
             )
             return await client.get_status()
@@ -60,6 +64,11 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         self._webapp_url: str | None = None
         self._api_path: str | None = None
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: config_entries.ConfigEntry) -> config_entries.OptionsFlow:
+        return OptionsFlowHandler()
+
     @callback
     def _async_get_entry(self):
         return self.async_create_entry(
@@ -111,11 +120,16 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 self._name = "AmpliPi"
                 self._vendor = "Unknown"
                 self._version = "Unknown"
-                self._uuid = ""  # this is not right.  we need a uuid
+                self._uuid = manual_unique_id(user_input[CONF_HOST], user_input[CONF_PORT])
                 self._webapp_url = f"http://${user_input[CONF_HOST]}"
                 self._api_path = f"/api"
 
+                await self._set_uid_and_abort()
+                # Or it may have been discovered already, under its zeroconf name
+                self._async_abort_entries_match({CONF_HOST: self._controller_hostname, CONF_PORT: self._controller_port})
                 return self._async_get_entry()
+            except data_entry_flow.AbortFlow:
+                raise
             except CannotConnect:
                 errors["base"] = "cannot_connect"
             except Exception:  # pylint: disable=broad-except
@@ -160,6 +174,8 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         self._api_path = discovery_info.properties['path']
 
         await self._set_uid_and_abort()
+        # The same controller may already have been added by hand, under its host and port rather than its zeroconf name
+        self._async_abort_entries_match({CONF_HOST: self._controller_hostname, CONF_PORT: self._controller_port})
 
         return await self.async_step_discovery_confirm()
 
@@ -203,5 +219,27 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         )
 
 
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle AmpliPi options."""
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> data_entry_flow.FlowResult:
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_COMMAND_LATENCY,
+                    description="Seconds to wait for further changes to a zone or group before sending them",
+                    default=self.config_entry.options.get(CONF_COMMAND_LATENCY, DEFAULT_COMMAND_LATENCY),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=2)),
+            }
+        )
+
+        return self.async_show_form(step_id="init", data_schema=schema)
+
+
 class CannotConnect(exceptions.HomeAssistantError):
     """Error to indicate we cannot connect."""
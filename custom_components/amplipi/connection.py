@@ -0,0 +1,142 @@
+"""
+    Dedicated HTTP connection pool for an AmpliPi controller
+    Keeps a few keep-alive connections open to the controller instead of sharing Home Assistant's general purpose session, and measures how requests fare
+"""
+from collections import deque
+from statistics import median
+from types import SimpleNamespace
+from typing import Optional, Union
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, TraceConfig
+
+from .const import MAX_CONNECTIONS, KEEPALIVE_TIMEOUT, CONNECT_TIMEOUT, READ_TIMEOUT
+
+# Latencies kept for the diagnostics percentiles
+LATENCY_SAMPLES = 200
+
+
+class ConnectionStats:
+    """Request latency and connection reuse for one controller, fed by aiohttp's request tracing"""
+
+    def __init__(self):
+        self.requests: int = 0
+        self.errors: int = 0
+        self.connections_created: int = 0
+        self.connections_reused: int = 0
+        self.latencies: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def trace_config(self) -> TraceConfig:
+        trace_config = TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_request_end.append(self._on_request_end)
+        trace_config.on_request_exception.append(self._on_request_exception)
+        trace_config.on_connection_create_end.append(self._on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuseconn)
+        return trace_config
+
+    async def _on_request_start(self, session: ClientSession, context: SimpleNamespace, params) -> None:
+        context.started = session.loop.time()
+
+    async def _on_request_end(self, session: ClientSession, context: SimpleNamespace, params) -> None:
+        # Measured up to the response headers
+        self.requests += 1
+        self.latencies.append(session.loop.time() - context.started)
+
+    async def _on_request_exception(self, session: ClientSession, context: SimpleNamespace, params) -> None:
+        self.requests += 1
+        self.errors += 1
+
+    async def _on_connection_create_end(self, session: ClientSession, context: SimpleNamespace, params) -> None:
+        self.connections_created += 1
+
+    async def _on_connection_reuseconn(self, session: ClientSession, context: SimpleNamespace, params) -> None:
+        self.connections_reused += 1
+
+    def diagnostics(self) -> dict:
+        latencies = sorted(self.latencies)
+        connections = self.connections_created + self.connections_reused
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "reuse_ratio": round(self.connections_reused / connections, 3) if connections else None,
+            "latency_ms": {
+                "median": round(median(latencies) * 1000, 1),
+                "p95": round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+                "max": round(latencies[-1] * 1000, 1),
+            } if latencies else None,
+        }
+
+
+class AmpliPiSession:
+    """
+        Stands in for the ClientSession handed to pyamplipi\n
+        pyamplipi passes a total-only ClientTimeout with every request, which would replace the session's own timeouts, so the connect and read
+        timeouts are filled back in on each request. Anything else is passed through to the underlying session
+    """
+
+    def __init__(self, session: ClientSession, stats: ConnectionStats, connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT):
+        self.session = session
+        self.stats = stats
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    def _timeout(self, timeout: Union[ClientTimeout, float, None]) -> ClientTimeout:
+        if not isinstance(timeout, ClientTimeout):
+            timeout = ClientTimeout(total=timeout)
+        # Only fill in what the caller left out
+        return ClientTimeout(
+            total=timeout.total,
+            connect=timeout.connect,
+            sock_connect=timeout.sock_connect if timeout.sock_connect is not None else self.connect_timeout,
+            sock_read=timeout.sock_read if timeout.sock_read is not None else self.read_timeout,
+        )
+
+    def request(self, method: str, url, **kwargs):
+        kwargs["timeout"] = self._timeout(kwargs.get("timeout"))
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    async def close(self) -> None:
+        await self.session.close()
+
+    def __getattr__(self, name: str):
+        return getattr(self.session, name)
+
+    def diagnostics(self) -> dict:
+        return {
+            "max_connections": self.session.connector.limit_per_host if self.session.connector is not None else None,
+            "keepalive_timeout": KEEPALIVE_TIMEOUT,
+            "connect_timeout": self.connect_timeout,
+            "read_timeout": self.read_timeout,
+            **self.stats.diagnostics(),
+        }
+
+
+def create_session(max_connections: int = MAX_CONNECTIONS, keepalive_timeout: Optional[float] = KEEPALIVE_TIMEOUT) -> AmpliPiSession:
+    """
+        Open a connection pool for a single controller\n
+        aiohttp already sets TCP_NODELAY on every connection it opens, so small PATCH requests go out without waiting on Nagle's algorithm
+    """
+    stats = ConnectionStats()
+    session = ClientSession(
+        connector=TCPConnector(limit_per_host=max_connections, keepalive_timeout=keepalive_timeout),
+        timeout=ClientTimeout(sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT),
+        trace_configs=[stats.trace_config()],
+    )
+    return AmpliPiSession(session, stats)
@@ -6,3 +6,62 @@ CONF_VERSION = "version"
 AMPLIPI_OBJECT = "amplipi_object"
 CONF_WEBAPP = "webapp"
 CONF_API_PATH = "api_path"
+
+# Seconds between polls of GET /api
+POLL_INTERVAL = 2
+# Seconds between polls right after a user command and while any source is playing. DataUpdateCoordinator schedules polls on whole
+# seconds of the event loop's clock, so anything shorter than a second makes it poll back to back until the next second comes round
+FAST_POLL_INTERVAL = 1
+# Seconds that polling stays fast for after a user command
+FAST_POLL_WINDOW = 10
+# Longest interval, in seconds, that polling backs off to while every zone is off
+IDLE_POLL_INTERVAL = 30
+
+CONF_COMMAND_LATENCY = "command_latency"
+# Seconds that zone and group updates are held for so that rapid changes to the same target are merged into one request
+DEFAULT_COMMAND_LATENCY = 0.1
+
+# Connections kept open to a controller at once, enough for a poll and a couple of commands in flight
+MAX_CONNECTIONS = 4
+# Seconds an idle pooled connection is kept, just under the 5 second keep-alive of the controller's web server so it's never reused after being closed
+KEEPALIVE_TIMEOUT = 4
+# Seconds allowed for opening a connection to the controller, and for each read once a request is sent
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 10
+
+# Seconds each kind of request may take before it's abandoned: polls fail fast and are retried, commands get longer as the user is waiting
+# on their result, and the config flow's connection check is bounded so that an unreachable controller can't hang the flow.
+# Setup itself only waits on the first poll
+POLL_TIMEOUT = 5
+COMMAND_TIMEOUT = 10
+SETUP_TIMEOUT = 10
+# Failed polls in a row after which the controller is treated as down and its entities are marked unavailable
+FAILURE_THRESHOLD = 3
+# Longest interval, in seconds, that polling backs off to while the controller is down
+MAX_BACKOFF_INTERVAL = 300
+
+# Seconds that writes of the status snapshot are held for, so that a burst of changes (ie. dragging a volume slider) is written to disk once
+SNAPSHOT_SAVE_DELAY = 30
+
+# Prefix of the unique_ids and entity_ids of a config entry's entities, the first controller keeps the plain DOMAIN prefix it always had
+CONF_ENTITY_PREFIX = "entity_prefix"
+
+# hass.data key of the poll stagger shared by every controller, and the minimum seconds between the polls of two different controllers
+POLL_STAGGER = f"{DOMAIN}_poll_stagger"
+POLL_SPACING = 0.5
+
+# Seconds of history kept by the timing histograms, and how many slices that is split into as it rolls over
+METRICS_WINDOW = 600
+METRICS_SLICES = 10
+
+# Seconds between updates of the (disabled by default) timing sensors
+METRICS_SENSOR_INTERVAL = 60
+
+# amplipi.profile service, which runs cProfile over a number of refreshes or for a fixed number of seconds
+SERVICE_PROFILE = "profile"
+ATTR_CYCLES = "cycles"
+ATTR_DURATION = "duration"
+ATTR_REBUILD = "rebuild"
+DEFAULT_PROFILE_CYCLES = 10
+# Functions listed in each section of the profile report
+PROFILE_REPORT_LINES = 60
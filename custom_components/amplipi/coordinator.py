@@ -2,29 +2,46 @@
     AmpliPi API data coordinator
     Used to synchronize the current AmpliPi state with all of the corresponding HA Entities
 """
+import asyncio
 from datetime import timedelta
-from typing import Optional, Union, Callable
+from time import monotonic
+from typing import Awaitable, Optional, Union, Callable
 from packaging.version import Version
 
+from homeassistant.core import Event, callback
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-from homeassistant.helpers.entity_registry import async_get as async_get_entity_registry
+from homeassistant.helpers.entity_registry import async_get as async_get_entity_registry, EVENT_ENTITY_REGISTRY_UPDATED
 from homeassistant.components import persistent_notification
 
 from pyamplipi.amplipi import AmpliPi
 from pyamplipi.models import SourceUpdate, ZoneUpdate, MultiZoneUpdate, GroupUpdate, PlayMedia, Announcement, Status as PyStatus, Source as PySource, Stream as PyStream, Group as PyGroup, Zone as PyZone, Status as PyStatus
 
-from .models import Status, Source, Zone, Group, Stream
-from .const import DOMAIN
+from .models import Status, Source, Zone, Group, Stream, StatusIndex, stream_id_of, HA_FIELDS
+from .commands import ZoneUpdateCoalescer, ZoneUpdateBatcher
+from .const import DOMAIN, POLL_INTERVAL, DEFAULT_COMMAND_LATENCY
+from .scheduler import AdaptivePollScheduler, PollStagger
+from .metrics import CoordinatorMetrics, timed, PHASE_FETCH, PHASE_ENRICH, PHASE_BUILD, PHASE_VALIDATE, PHASE_DISPATCH, PHASE_COMMAND
+from .timeouts import TimeoutPolicy, CircuitBreaker
+from .snapshot import StatusSnapshot
+
+# Status list key, entity kind (as used in unique_ids) and model of every AmpliPi object that becomes an entity
+ENTITY_KINDS = (
+    ("sources", "source", Source),
+    ("zones", "zone", Zone),
+    ("groups", "group", Group),
+    ("streams", "stream", Stream),
+)
 
 class AmpliPiDataClient(DataUpdateCoordinator, AmpliPi):
-    def __init__(self, hass, logger, config_entry, endpoint, timeout, http_session):
+    def __init__(self, hass, logger, config_entry, endpoint, timeout, http_session, command_latency: float = DEFAULT_COMMAND_LATENCY,
+                 entity_prefix: str = DOMAIN, stagger: Optional[PollStagger] = None):
         super().__init__(
             hass,
             logger,
             config_entry=config_entry,
             name="hacs_amplipi",
-            update_interval=timedelta(seconds=2),
-            always_update=True
+            update_interval=timedelta(seconds=POLL_INTERVAL),
+            always_update=False,
         )
 
         AmpliPi.__init__(
@@ -34,133 +51,505 @@ class AmpliPiDataClient(DataUpdateCoordinator, AmpliPi):
             http_session=http_session
         )
 
-    async def get_friendly_name(self, entity_id):
+        # The controller's own connection pool, kept for its diagnostics
+        self.http_session = http_session
+
+        # Prefix of every unique_id and entity_id this controller's entities get, ie. amplipi for amplipi_zone_0
+        self.entity_prefix = entity_prefix
+
+        self.scheduler = AdaptivePollScheduler()
+        self.stagger = stagger if stagger is not None else PollStagger()
+        config_entry.async_on_unload(self.stagger.register(config_entry.entry_id, config_entry.title))
+        self.timeouts = TimeoutPolicy()
+        self.metrics = CoordinatorMetrics()
+        self.breaker = CircuitBreaker()
+
+        # Data loaded from the snapshot is shown, but the entities stay unavailable until the controller itself has answered a poll
+        self.snapshot = StatusSnapshot(hass, config_entry.entry_id)
+        self.live: bool = False
+        self.coalescer = ZoneUpdateCoalescer(hass, command_latency)
+        self.batcher = ZoneUpdateBatcher(hass, self._set_zones)
+        # Streams being connected to a source, by stream id, see connect_stream_once
+        self._stream_connections: dict[int, asyncio.Future] = {}
+
+        # Raw payload and built model of every object from the previous set_data call, by kind and amplipi id, used to only rebuild what changed
+        self._payloads: dict[str, dict] = {}
+        self._built: dict[str, dict] = {}
+        self._index: Optional[StatusIndex] = None
+
+        # Stream names each source can select, by source id, shared by the source entities and cleared whenever a stream changes
+        self.source_lists: dict[int, list[str]] = {}
+
+        # (kind, amplipi id) of every object that changed in the most recent update pushed to the listeners
+        self.changes: set[tuple[str, int]] = set()
+        # (kind, amplipi id) of every entity that needs to write its state for the update being pushed, None meaning all of them
+        self.affected: Optional[set[tuple[str, int]]] = None
+
+        # unique_id -> entity_id for every AmpliPi entity in the entity registry, built on first use
+        self._entity_id_index: Optional[dict[str, str]] = None
+        config_entry.async_on_unload(
+            hass.bus.async_listen(EVENT_ENTITY_REGISTRY_UPDATED, self._handle_entity_registry_update)
+        )
+
+    def _build_entity_id_index(self) -> dict[str, str]:
+        """Walk the entity registry once and index every AmpliPi entity by its unique_id"""
+        registry = async_get_entity_registry(self.hass)
+        return {
+            entry.unique_id: entry.entity_id
+            for entry in registry.entities.values()
+            if entry.config_entry_id == self.config_entry.entry_id
+        }
+
+    @callback
+    def _handle_entity_registry_update(self, event: Event) -> None:
+        """Keep the unique_id index and the built models in step with this controller's entities being created, renamed or removed"""
+        stale_ids = {event.data["entity_id"], event.data.get("old_entity_id")}
+        entry = None
+        if event.data["action"] != "remove":
+            entry = async_get_entity_registry(self.hass).async_get(event.data["entity_id"])
+            if entry is not None and entry.config_entry_id != self.config_entry.entry_id:
+                entry = None
+
+        # Entity ids and friendly names are baked into the built models, forgetting the payload of the object behind the entity has it
+        # rebuilt on the next update. Removed entities are no longer in the registry, so they're matched on the entity_id their model holds
+        for kind, built in self._built.items():
+            for amplipi_id, model in built.items():
+                if model.entity_id in stale_ids or (entry is not None and model.unique_id == entry.unique_id):
+                    self._payloads.get(kind, {}).pop(amplipi_id, None)
+
+        if self._entity_id_index is None:
+            return
+
+        for unique_id in [uid for uid, entity_id in self._entity_id_index.items() if entity_id in stale_ids]:
+            del self._entity_id_index[unique_id]
+
+        if entry is not None:
+            self._entity_id_index[entry.unique_id] = entry.entity_id
+
+    @callback
+    def _set_poll_interval(self, interval: timedelta) -> None:
+        """Apply the interval picked by the scheduler, moving the pending poll if the interval changed"""
+        if interval == self.update_interval:
+            return
+        self.logger.debug(f"AmpliPi polling every {interval.total_seconds()}s ({self.scheduler.policy})")
+        self.update_interval = interval
+        if self._listeners:
+            self._schedule_refresh()
+
+    def _friendly_name(self, entity_id: str) -> Optional[str]:
         """Look up entity in hass.states and get the friendly name"""
         state = self.hass.states.get(entity_id)
         if state:
             return state.attributes.get("friendly_name")
-        
-    async def get_entity_id_from_unique_id(self, unique_id: str):
-        """Gets entity_id from the entity registry using the unique_id"""
-        registry = async_get_entity_registry(self.hass)
-        for entry in registry.entities.values():
-            if entry.unique_id == unique_id:
-                return entry.entity_id
         return None
+
+    def _entity_ids(self) -> dict[str, str]:
+        """unique_id -> entity_id of every entity of this controller, built from the entity registry on first use"""
+        if self._entity_id_index is None:
+            self._entity_id_index = self._build_entity_id_index()
+        return self._entity_id_index
     
     async def _async_update_data(self) -> Status:
         """Fetch data from API endpoint and pre-process into lookup tables."""
-        return await self.get_status()
-        
+        await self.stagger.async_wait(self.config_entry.entry_id)
+        started = monotonic()
+        try:
+            async with asyncio.timeout(self.timeouts.poll):
+                response = await super().get_status()
+        except Exception as e:  # pylint: disable=broad-except
+            self.stagger.record(self.config_entry.entry_id, monotonic() - started, False)
+            self.metrics.record(PHASE_FETCH, monotonic() - started, False)
+            self._handle_poll_failure()
+            raise UpdateFailed(f"Error fetching data: {e}") from e
+        self.stagger.record(self.config_entry.entry_id, monotonic() - started, True)
+        self.metrics.record(PHASE_FETCH, monotonic() - started)
+
+        recovered = self.breaker.record_success()
+        if recovered:
+            self.logger.info("AmpliPi controller is reachable again")
+        self.scheduler.set_backoff(None)
+
+        # Leave notifying the listeners to the coordinator's own refresh so that they aren't woken up twice per poll
+        status = await self.set_data(response.model_dump(), publish=False)
+        self._set_poll_interval(self.scheduler.update(status))
+
+        if recovered:
+            # Every entity was marked unavailable when the breaker opened, so all of them need to hear that it closed, changed or not
+            self.affected = None
 
-    async def set_data(self, state: PyStatus) -> Status:
+        if not self.live:
+            self.live = True
+            self.snapshot.async_delay_save(lambda: self.data, delay=0)
+            # Entities created from the snapshot need to hear that they're available even if nothing changed since,
+            # the coordinator notifies them once self.data is assigned since last_update_success goes from False to True
+            self.affected = None
+        return status
+
+    async def async_load_snapshot(self) -> bool:
+        """Use the status saved by the last run as the coordinator's data until the first poll, returns False if there isn't one"""
+        status = await self.snapshot.async_load()
+        if status is None:
+            return False
+        self.data = status
+        # Nothing has been fetched from the controller yet, the first live poll flipping this makes sure the listeners hear of it
+        self.last_update_success = False
+        self._seed_from(status)
+        return True
+
+    def _seed_from(self, status: Status) -> None:
         """
-        Take in a Status object from the AmpliPi API and add home assistant specific encoding to it before pushing it to global state.
-        Returns the newly encoded Status object just so that _async_update_data has something to return as well.
+            Take the payloads and models of a snapshot as those of the previous update\n
+            The first live poll is then diffed against the snapshot, so only the objects that changed while Home Assistant was down are rebuilt
         """
-        async def build_entity(entity: Union[PySource, PyZone, PyGroup, PyStream], kind: str, cls, original_name: str):
+        for key, kind, _ in ENTITY_KINDS:
+            self._built[kind] = {entity.id: entity for entity in getattr(status, key)}
+            self._payloads[kind] = {entity.id: entity.model_dump(exclude=HA_FIELDS) for entity in getattr(status, key)}
+        self._payloads["info"] = status.info.model_dump() if status.info is not None else None
+        self._payloads["presets"] = [preset.model_dump() for preset in status.presets]
+
+    def invalidate_built(self) -> None:
+        """Forget the payload of every object, so that the next update rebuilds all of them as on a first poll"""
+        self._payloads = {}
+
+    def _handle_poll_failure(self) -> None:
+        if self.breaker.record_failure():
+            self.logger.warning(f"AmpliPi controller failed {self.breaker.failures} polls in a row, marking its entities unavailable")
+            # The coordinator only notifies listeners when a poll first fails, so let the entities know that they're now unavailable
+            self.affected = None
+            self.async_update_listeners()
+        self._set_poll_interval(self.scheduler.set_backoff(self.breaker.backoff))
+
+    @property
+    def controller_available(self) -> bool:
+        """False until the controller has answered a poll, and while the circuit breaker considers it down"""
+        return self.live and not self.breaker.open
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all registered listeners, after which the affected set goes back to covering every entity"""
+        with self.metrics.time(PHASE_DISPATCH):
+            super().async_update_listeners()
+        self.affected = None
+
+    def is_affected(self, kind: str, amplipi_id: int) -> bool:
+        """Does the update currently being pushed to the listeners touch the entity for the given AmpliPi object?"""
+        return self.affected is None or (kind, amplipi_id) in self.affected
+
+    @timed(PHASE_BUILD)
+    def _build_entities(self, kind: str, cls, entities: list[dict]) -> list:
+        """
+            Build the encoded models for a batch of AmpliPi objects of one kind\n
+            Entity ids and friendly names for the whole batch are resolved in one go from the registry index and the state machine, without yielding to the event loop
+        """
+        entity_ids = self._entity_ids()
+        built = []
+        for entity in entities:
+            original_name = f"Source {entity['id'] + 1}" if kind == "source" else entity["name"]
             try:
-                unique_id = f"{DOMAIN}_{kind}_{entity['id']}"
-                entity_id = await self.get_entity_id_from_unique_id(unique_id) or f"media_player.{unique_id}"
-                friendly_name = await self.get_friendly_name(entity_id) or original_name
-                return cls(
+                unique_id = f"{self.entity_prefix}_{kind}_{entity['id']}"
+                entity_id = entity_ids.get(unique_id) or f"media_player.{unique_id}"
+                built.append(cls(
                     **entity,
                     original_name=original_name,
                     unique_id=unique_id,
                     entity_id=entity_id,
-                    friendly_name=friendly_name,
-                )
+                    friendly_name=self._friendly_name(entity_id) or original_name,
+                    amplipi_kind=kind,
+                    amplipi_id=entity["id"],
+                ))
             except TypeError as e:
                 self.logger.error(f"Original name = {original_name}, entity = {entity}")
                 raise TypeError(e) from e
+        return built
 
-        try:
-            state["sources"] = [
-                await build_entity(entity, "source", Source, f"Source {entity['id'] + 1}")
-                for entity in state["sources"]
-            ]
+    def _merge_entities(self, kind: str, cls, entities: list[dict], changes: set[tuple[str, int]]) -> tuple[list, dict, dict]:
+        """
+            Build the encoded models for one kind of AmpliPi object, reusing the previous model of every object whose payload didn't change\n
+            Adds the (kind, amplipi id) of every built or removed object to changes and returns the models along with the payloads and models by id
+        """
+        previous_payloads = self._payloads.get(kind, {})
+        previous_built = self._built.get(kind, {})
+        payloads = {entity["id"]: entity for entity in entities}
+        stale = [
+            entity for entity in entities
+            if entity["id"] not in previous_built or previous_payloads.get(entity["id"]) != entity
+        ]
 
-            state["zones"] = [
-                await build_entity(entity, "zone", Zone, entity["name"])
-                for entity in state["zones"]
-            ]
+        built = {amplipi_id: previous_built.get(amplipi_id) for amplipi_id in payloads}
+        for entity in self._build_entities(kind, cls, stale):
+            built[entity.id] = entity
+            changes.add((kind, entity.id))
+        changes.update((kind, amplipi_id) for amplipi_id in previous_payloads.keys() - payloads.keys())
+        return list(built.values()), payloads, built
 
-            state["groups"] = [
-                await build_entity(entity, "group", Group, entity["name"])
-                for entity in state["groups"]
-            ]
+    def _affected_entities(self, changes: set[tuple[str, int]], previous: Optional[Status], status: Status) -> Optional[set[tuple[str, int]]]:
+        """
+            Work out which entities need to write their state for a set of changed AmpliPi objects\n
+            Returns None (meaning every entity) if objects were added or removed, as relationships between entities may have changed
+        """
+        if previous is None:
+            return None
 
-            state["streams"] = [
-                await build_entity(entity, "stream", Stream, entity["name"])
-                for entity in state["streams"]
-            ]
+        old = self.index_of(previous)
+        new = self.index_of(status)
+        if any(getattr(old, key).keys() != getattr(new, key).keys() for key, _, _ in ENTITY_KINDS):
+            return None
+
+        def source_and_stream(source_id: Optional[int]):
+            yield ("source", source_id)
+            stream_id = stream_id_of(new.sources[source_id]) if source_id in new.sources else None
+            if stream_id is not None:
+                yield ("stream", stream_id)
 
-            minimum_version = "0.4.7"
-            current_version = state["info"]["version"]
-            if Version(current_version) < Version(minimum_version):
-                persistent_notification.create(self.hass, f"AmpliPi version must be at least {minimum_version} to work properly, please go to http://amplipi.local:5001/update to correct this", "AmpliPi version too low", f"{current_version}_version_error")
+        affected: set[tuple[str, int]] = set()
+        for kind, amplipi_id in changes:
+            affected.add((kind, amplipi_id))
+            if kind == "zone":
+                # Sources and streams show the volume of their zones, groups show whether their zones agree on a source
+                for zone in (old.zones[amplipi_id], new.zones[amplipi_id]):
+                    affected.update(source_and_stream(zone.source_id))
+                affected.update(("group", group.id) for group in status.groups if amplipi_id in group.zones)
+            elif kind == "group":
+                for group in (old.groups[amplipi_id], new.groups[amplipi_id]):
+                    affected.update(source_and_stream(group.source_id))
+            elif kind == "source":
+                # Zones and groups show what's playing on their source, streams show which source they're connected to
+                affected.update(("zone", zone.id) for zone in new.zones_by_source.get(amplipi_id, ()))
+                affected.update(("group", group.id) for group in new.groups_by_source.get(amplipi_id, ()))
+                for source in (old.sources[amplipi_id], new.sources[amplipi_id]):
+                    stream_id = stream_id_of(source)
+                    if stream_id is not None:
+                        affected.add(("stream", stream_id))
+            elif kind == "stream":
+                # Every source lists the streams it can connect to
+                affected.update(("source", source.id) for source in status.sources)
+        return affected
 
-            status = Status(**state)
+    def index_of(self, status: Status) -> StatusIndex:
+        """Id-keyed lookups over a Status, the index of the most recent Status is kept so it is only built once per refresh"""
+        if self._index is None or self._index.status is not status:
+            self._index = StatusIndex(status)
+        return self._index
+
+    @property
+    def index(self) -> Optional[StatusIndex]:
+        """Id-keyed lookups over the current coordinator data"""
+        if self.data is None:
+            return None
+        return self.index_of(self.data)
+
+    def _publish(self, status: Status, changes: set[tuple[str, int]], publish: bool) -> None:
+        if self.live:
+            # Reads self.data when the write happens, by which point a polled status has been stored by the coordinator
+            self.snapshot.async_delay_save(lambda: self.data)
+        if any(kind == "stream" for kind, _ in changes):
+            # Covers streams being added, removed or renamed, including renames of their entities as those rebuild every model
+            self.source_lists = {}
+        self.affected = self._affected_entities(changes, self.data, status)
+        self.changes = changes
+        if publish:
             self.async_set_updated_data(status)
+
+    @timed(PHASE_ENRICH)
+    async def set_data(self, state: PyStatus, publish: bool = True) -> Status:
+        """
+        Take in a Status object from the AmpliPi API and add home assistant specific encoding to it before pushing it to global state.
+        Only objects whose payload differs from the previous call are rebuilt, and listeners are only notified if something changed.
+        Returns the current encoded Status object just so that _async_update_data has something to return as well.
+        """
+        try:
+            changes: set[tuple[str, int]] = set()
+            payloads: dict[str, dict] = {}
+            built: dict[str, dict] = {}
+
+            for key, kind, cls in ENTITY_KINDS:
+                state[key], payloads[kind], built[kind] = self._merge_entities(kind, cls, state[key], changes)
+
+            for key in ("info", "presets"):
+                payloads[key] = state[key]
+                if self._payloads.get(key) != state[key]:
+                    changes.add((key, 0))
+
+            if not changes and self.data is not None:
+                return self.data
+
+            if ("info", 0) in changes:
+                minimum_version = "0.4.7"
+                current_version = state["info"]["version"]
+                if Version(current_version) < Version(minimum_version):
+                    persistent_notification.create(self.hass, f"AmpliPi version must be at least {minimum_version} to work properly, please go to http://amplipi.local:5001/update to correct this", "AmpliPi version too low", f"{current_version}_version_error")
+
+            with self.metrics.time(PHASE_VALIDATE):
+                status = Status(**state)
+            self._payloads = payloads
+            self._built = built
+            self._publish(status, changes, publish)
             return status
 
         except Exception as e:
             raise UpdateFailed(f"Error fetching data: {e}") from e
+
+    @timed(PHASE_ENRICH)
+    async def patch_data(self, state: PyStatus, touched: tuple[str, ...]) -> Status:
+        """
+        Fast path for the Status returned by a write, only the kinds of object that the write touched (ie. "zones" and "groups") are merged
+        into the existing coordinator data and everything else in the response is left for the next poll to pick up.
+        """
+        if self.data is None:
+            return await self.set_data(state.model_dump())
+
+        try:
+            changes: set[tuple[str, int]] = set()
+            update = {}
+            for key, kind, cls in ENTITY_KINDS:
+                if key in touched:
+                    entities = [entity.model_dump() for entity in getattr(state, key)]
+                    update[key], self._payloads[kind], self._built[kind] = self._merge_entities(kind, cls, entities, changes)
+
+            if not changes:
+                return self.data
+
+            status = self.data.model_copy(update=update)
+            self._publish(status, changes, True)
+            return status
+
+        except Exception as e:
+            raise UpdateFailed(f"Error consuming response: {e}") from e
         
     # TODO: Find a better way to do the following without all the repeated boilerplate code
         
-    def intercept_and_consume(func: Callable):
-        """Intercept the return of a function and consume the data into the data coordinator"""
+    def intercept_and_consume(*touched: str):
+        """
+            Intercept the return of a function and consume the data into the data coordinator\n
+            touched lists the kinds of object ("sources", "zones", "groups", "streams") a write can change, only those are taken from the response
+        """
+        def decorator(func: Callable):
+            async def wrapper(self, *args, **kwargs):
+                if not touched:
+                    async with asyncio.timeout(self.timeouts.command):
+                        resp = await func(self, *args, **kwargs)
+                    return await self.set_data(resp.model_dump())
+
+                # Only writes name what they touch, each is timed on its own and together with every other write
+                started = monotonic()
+                success = False
+                try:
+                    async with asyncio.timeout(self.timeouts.command):
+                        resp = await func(self, *args, **kwargs)
+                    status = await self.patch_data(resp, touched)
+                    success = True
+                    return status
+                finally:
+                    elapsed = monotonic() - started
+                    self.metrics.record(PHASE_COMMAND, elapsed, success)
+                    self.metrics.record(f"{PHASE_COMMAND}.{func.__name__.lstrip('_')}", elapsed, success)
+            return wrapper
+        return decorator
+
+    def user_command(func: Callable):
+        """Speed polling up for a while after any command sent on behalf of the user"""
         async def wrapper(self, *args, **kwargs):
-            resp = await func(self, *args, **kwargs)
-            return await self.set_data(resp.dict())
+            self._set_poll_interval(self.scheduler.note_command())
+            return await func(self, *args, **kwargs)
         return wrapper
 
-    @intercept_and_consume
+    @intercept_and_consume()
     async def get_status(self) -> Status:
         return await super().get_status()
 
-    @intercept_and_consume
+    @user_command
+    @intercept_and_consume("sources", "streams")
     async def set_source(self, source_id: int, source_update: SourceUpdate) -> Status:
         return await super().set_source(source_id, source_update)
         
-    @intercept_and_consume
+    async def connect_stream_once(self, stream_id: int, connect: Callable[[], Awaitable[Optional[int]]]) -> Optional[int]:
+        """
+            Give a stream a source by awaiting connect, which returns the source id
+
+            Callers that arrive while the stream is already being connected (ie. one service call for several zones) get the same source id instead
+            of each picking a source, and all resume in the same tick so that their zone updates still end up in one batch
+        """
+        connection = self._stream_connections.get(stream_id)
+        if connection is None:
+            connection = self._stream_connections[stream_id] = self.hass.async_create_task(connect(), eager_start=True)
+            connection.add_done_callback(lambda _: self._stream_connections.pop(stream_id, None))
+        return await asyncio.shield(connection)
+
+    @user_command
     async def set_zone(self, zone_id: int, zone_update: ZoneUpdate) -> Status:
-        return await super().set_zone(zone_id, zone_update)
+        return await self._submit_zone_update(zone_update, zones=[zone_id])
 
-    @intercept_and_consume
+    @user_command
     async def set_zones(self, zone_update: MultiZoneUpdate) -> Status:
+        return await self._submit_zone_update(zone_update.update, zones=zone_update.zones, groups=zone_update.groups)
+
+    async def _submit_zone_update(self, update: ZoneUpdate, zones: Optional[list[int]] = None, groups: Optional[list[int]] = None) -> Status:
+        """
+            Hand an update for the given zones and groups to the coalescer one zone at a time, so that updates reaching a zone through set_zone,
+            set_zones or one of its groups are merged and sent in order. Zones that end up with the same update are batched back into one request
+        """
+        index = self.index
+        zone_ids = list(zones or ())
+        unknown_groups = []
+        for group_id in groups or ():
+            members = index.group_zones.get(group_id) if index is not None else None
+            if members is None:
+                unknown_groups.append(group_id)
+            else:
+                zone_ids.extend(member.id for member in members)
+
+        results = await asyncio.gather(*(
+            [
+                self.coalescer.submit(("zone", zone_id), update, lambda merged, zone_id=zone_id: self.batcher.submit(merged, zones=[zone_id]))
+                for zone_id in dict.fromkeys(zone_ids)
+            ] + [
+                # Groups the coordinator doesn't know the members of yet are left for the controller to expand
+                self.coalescer.submit(("group", group_id), update, lambda merged, group_id=group_id: self.batcher.submit(merged, groups=[group_id]))
+                for group_id in unknown_groups
+            ]
+        ))
+        return results[-1] if results else self.data
+
+    @intercept_and_consume("zones", "groups")
+    async def _set_zones(self, zone_update: MultiZoneUpdate) -> Status:
         return await super().set_zones(zone_update)
         
-    @intercept_and_consume
+    @user_command
+    @intercept_and_consume("sources", "streams")
     async def play_media(self, media: PlayMedia) -> Status:
         return await super().play_media(media)
 
-    @intercept_and_consume
+    @user_command
+    @intercept_and_consume("zones", "groups")
     async def set_group(self, group_id, update: GroupUpdate) -> Status:
         return await super().set_group(group_id, update)
 
-    @intercept_and_consume
+    @user_command
+    @intercept_and_consume("sources", "zones", "groups", "streams")
     async def announce(self, announcement: Announcement, timeout: Optional[int] = None) -> Status:
         return await super().announce(announcement, timeout)
 
-    @intercept_and_consume
+    @user_command
+    @intercept_and_consume("sources", "streams")
     async def play_stream(self, stream_id: int) -> Status:
         return await super().play_stream(stream_id)
 
-    @intercept_and_consume
+    @user_command
+    @intercept_and_consume("sources", "streams")
     async def pause_stream(self, stream_id: int) -> Status:
         return await super().pause_stream(stream_id)
 
-    @intercept_and_consume
+    @user_command
+    @intercept_and_consume("sources", "streams")
     async def previous_stream(self, stream_id: int) -> Status:
         return await super().previous_stream(stream_id)
 
-    @intercept_and_consume
+    @user_command
+    @intercept_and_consume("sources", "streams")
     async def next_stream(self, stream_id: int) -> Status:
         return await super().previous_stream(stream_id)
 
-    @intercept_and_consume
+    @user_command
+    @intercept_and_consume("sources", "streams")
     async def stop_stream(self, stream_id: int) -> Status:
         return await super().stop_stream(stream_id)
-        
\ No newline at end of file
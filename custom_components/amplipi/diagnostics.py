@@ -0,0 +1,28 @@
+"""Diagnostics support for the AmpliPi integration."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, AMPLIPI_OBJECT
+from .coordinator import AmpliPiDataClient
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: AmpliPiDataClient = hass.data[DOMAIN][entry.entry_id][AMPLIPI_OBJECT]
+
+    return {
+        "entry": dict(entry.data),
+        "last_update_success": coordinator.last_update_success,
+        "polling": coordinator.scheduler.diagnostics(),
+        "timeouts": coordinator.timeouts.diagnostics(),
+        "circuit_breaker": coordinator.breaker.diagnostics(),
+        "command_coalescing": coordinator.coalescer.diagnostics(),
+        "command_batching": coordinator.batcher.diagnostics(),
+        "connection": coordinator.http_session.diagnostics(),
+        "controllers": coordinator.stagger.diagnostics(),
+        "timings": coordinator.metrics.diagnostics(),
+    }
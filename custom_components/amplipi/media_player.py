@@ -2,11 +2,11 @@
 # pylint: disable=W1203
 import logging
 import operator
-import re
 from functools import reduce
 from typing import List, Optional, Union
 
 import validators
+from homeassistant.core import callback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.components import media_source, persistent_notification
 from homeassistant.components.media_player import MediaPlayerDeviceClass, MediaPlayerEntity, MediaPlayerEntityFeature, MediaType
@@ -21,7 +21,7 @@ from pyamplipi.models import ZoneUpdate, SourceUpdate, GroupUpdate, Announcement
 from .coordinator import AmpliPiDataClient
 from .const import (
     DOMAIN, AMPLIPI_OBJECT, CONF_VENDOR, CONF_VERSION, CONF_WEBAPP, )
-from .models import Source, Group, Zone, Stream
+from .models import Source, Group, Zone, Stream, stream_id_of
 
 SUPPORT_AMPLIPI_DAC = (
         MediaPlayerEntityFeature.SELECT_SOURCE
@@ -54,7 +54,8 @@ SUPPORT_LOOKUP_DICT = {
 }
 _LOGGER = logging.getLogger(__name__)
 
-PARALLEL_UPDATES = 1
+# Commands are ordered per zone/group by the coordinator's coalescer, so service calls don't need serializing here
+PARALLEL_UPDATES = 0
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up the AmpliPi MultiZone Audio Controller"""
@@ -65,27 +66,28 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     name = hass_entry[CONF_NAME]
     version = hass_entry[CONF_VERSION]
     image_base_path = f'{hass_entry[CONF_WEBAPP]}'
+    namespace = amplipi_coordinator.entity_prefix
 
     status = amplipi_coordinator.data if amplipi_coordinator.data is not None else await amplipi_coordinator.get_status()
     sources: list[AmpliPiMediaPlayer] = [
-        AmpliPiSource(DOMAIN, source, status.streams, vendor, version, image_base_path, amplipi_coordinator)
+        AmpliPiSource(namespace, source, status.streams, vendor, version, image_base_path, amplipi_coordinator)
         for source in status.sources]
 
     zones: list[AmpliPiMediaPlayer] = [
-        AmpliPiZone(DOMAIN, zone, None, status.streams, status.sources, vendor, version, image_base_path, amplipi_coordinator)
+        AmpliPiZone(namespace, zone, None, status.streams, status.sources, vendor, version, image_base_path, amplipi_coordinator)
         for zone in status.zones]
 
     groups: list[AmpliPiMediaPlayer] = [
-        AmpliPiZone(DOMAIN, None, group, status.streams, status.sources, vendor, version, image_base_path, amplipi_coordinator)
+        AmpliPiZone(namespace, None, group, status.streams, status.sources, vendor, version, image_base_path, amplipi_coordinator)
         for group in status.groups]
     
     streams: list[AmpliPiMediaPlayer] = [
-        AmpliPiStream(DOMAIN, stream, status.sources, vendor, version, image_base_path, amplipi_coordinator)
+        AmpliPiStream(namespace, stream, status.sources, vendor, version, image_base_path, amplipi_coordinator)
         for stream in status.streams
     ]
 
     announcer: list[MediaPlayerEntity] = [
-        AmpliPiAnnouncer(DOMAIN, vendor, version, image_base_path, amplipi_coordinator)
+        AmpliPiAnnouncer(namespace, vendor, version, image_base_path, amplipi_coordinator)
     ]
 
     async_add_entities(sources + zones + groups + streams + announcer)
@@ -113,6 +115,9 @@ class AmpliPiMediaPlayer(MediaPlayerEntity, CoordinatorEntity):
     # The amplipi-side id
     _id: int
 
+    # What kind of AmpliPi object the entity represents, one of "source", "zone", "group" or "stream"
+    _kind: str
+
     # Home assistant side immutible id
     _unique_id: str
 
@@ -149,45 +154,59 @@ class AmpliPiMediaPlayer(MediaPlayerEntity, CoordinatorEntity):
     # The displayname of the entity. Also what is passed to async_select_source via dropdown menus.
     _name: str
 
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Only sync and write state when the coordinator's update touched this entity"""
+        if self._data_client.is_affected(self._kind, self._id):
+            self._refresh_state()
+            super()._handle_coordinator_update()
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self._refresh_state()
+
+    def sync_state(self):
+        """Pull the entity's AmpliPi objects out of the latest coordinator data, implemented by each kind of entity"""
+
+    def _current_state(self) -> str:
+        """Media player state derived from what the last sync_state call pulled in, implemented by each kind of entity"""
+        return STATE_UNKNOWN
+
+    @callback
+    def _refresh_state(self) -> None:
+        """Sync with the coordinator data once and cache the result, the state property then just reads _attr_state back"""
+        self.sync_state()
+        self._attr_state = self._current_state()
+
+    @callback
+    def _write_local_state(self) -> None:
+        """Write state after a change that only exists on the Home Assistant side, such as _is_off on a source"""
+        self._attr_state = self._current_state()
+        self.async_write_ha_state()
+
     def get_entry_by_value(self, value: str) -> Union[Source, Zone, Group, Stream, None]:
-        """Find what dict within the state array has a given value and return said dict"""
-        if self._data_client.data is not None:
-            for category in (self._data_client.data.sources, self._data_client.data.zones, self._data_client.data.groups, self._data_client.data.streams):
-                for entry in category:
-                    if value in entry.model_dump().values():
-                        return entry
+        """Find the source, zone, group or stream that has the given name, friendly name, entity_id or unique_id"""
+        index = self._data_client.index
+        if index is not None:
+            return index.by_value.get(value)
         return None
             
-    def extract_amplipi_id_from_unique_id(self, uid: str) -> Optional[int]:
+    def available_streams(self, source: Source):
         """
-            Extracts all digits from a string and returns them\n
-            Useful for getting amplipi-side ids out of entity unique_ids due to the unique_id being formatted as "media_player.amplipi_{stream, group, zone, or source}_{amplipi-side id}"\n
-            Examples:\n
-            media_player.amplipi_stream_1000\n
-            media_player.amplipi_source_0
+            Returns the available streams (generally all of them minus three of the four RCAs) relative to the provided source\n
+            Lists are cached on the coordinator, which drops them whenever a stream changes
         """
-        match = re.search(r"\d+", uid)
-        if match:
-            return int(match.group())
-        if uid != "amplipi_announcement":
-            # amplipi_announcement is the only amplipi entity without numbers in its id
-            # Filter against that before sending an error message so you don't print an error every few seconds whenever a source polls for the source list
-            _LOGGER.error(f"extract_amplipi_id_from_unique_id could not determine entity ID: {uid}")
-        return None
+        if self._data_client.data is None:
+            return ['None']
 
-    def available_streams(self, source: Source):
-        """Returns the available streams (generally all of them minus three of the four RCAs) relative to the provided source"""
-        streams: List[str] = ['None']
-        if self._data_client.data is not None:
+        streams = self._data_client.source_lists.get(source.id)
+        if streams is None:
+            streams = ['None']
             # Excludes every RCA except for the one related to the given source
-            RCAs = [996, 997, 998, 999]
-            rca_selectable = RCAs[source.id]
-            stream_entries = self._data_client.data.streams
-            if stream_entries:
-                for entry in stream_entries:
-                    amplipi_id = self.extract_amplipi_id_from_unique_id(entry.unique_id)
-                    if amplipi_id == rca_selectable or amplipi_id not in RCAs:
-                        streams.append(entry.friendly_name if entry.friendly_name not in [None, 'None'] else entry.original_name)
+            for entry in self._data_client.data.streams:
+                if not has_fixed_source(entry) or get_fixed_source_id(entry) == source.id:
+                    streams.append(entry.friendly_name if entry.friendly_name not in [None, 'None'] else entry.original_name)
+            self._data_client.source_lists[source.id] = streams
         return streams
     
     async def async_connect_stream_to_source(self, stream: Stream, source: Optional[Source] = None):
@@ -200,8 +219,7 @@ class AmpliPiMediaPlayer(MediaPlayerEntity, CoordinatorEntity):
             if self._source is not None and source is not None and source.id != self._source.id:
                 raise Exception("RCA streams can only connect to sources with the same ID")
 
-            state = self._data_client.data
-            source = state.sources[get_fixed_source_id(stream)]
+            source = self._data_client.index.sources[get_fixed_source_id(stream)]
             # It would be cleaner to do the following, but pyamplipi doesn't support RCA stream's index value atm:
             # source = state.sources[self._stream.index]
             if source.input not in [None, "None"]:
@@ -241,13 +259,14 @@ class AmpliPiMediaPlayer(MediaPlayerEntity, CoordinatorEntity):
 
     async def async_connect_zones_to_stream(self, stream: Stream, zones: Optional[List[int]], groups: Optional[List[int]]):
         """Connects zones and/or groups to the source of the selected stream. If stream does not have a source, select one"""
-        state = self._data_client.data
-        source_id = next((s.id for s in state.sources if s.input == f"stream={stream.id}"), None)
-        if source_id is None:
-            source_id = await self.async_connect_stream_to_source(stream)
+        source = self._data_client.index.source_by_stream.get(stream.id)
+        if source is None:
+            source_id = await self._data_client.connect_stream_once(stream.id, lambda: self.async_connect_stream_to_source(stream))
+            if source_id is not None:
+                source = self._data_client.index.sources.get(source_id)
         
-        if source_id is not None:
-            await self.async_connect_zones_to_source(state.sources[source_id], zones, groups)
+        if source is not None:
+            await self.async_connect_zones_to_source(source, zones, groups)
 
 
     def build_url(self, img_url):
@@ -295,9 +314,9 @@ class AmpliPiMediaPlayer(MediaPlayerEntity, CoordinatorEntity):
     
     async def swap_source(self, old_source: int, new_source: Optional[int] = None):
         """Moves a stream from one source to another, ensuring all zones follow. Generally only used for RCA streams, but able to be used by anyone."""
-        state = self._data_client.data
+        index = self._data_client.index
         
-        moved_stream: Stream = next(filter(lambda s: state.sources[old_source].input == f"stream={s.id}", state.streams), None)
+        moved_stream: Stream = index.stream_on(index.sources.get(old_source))
         if moved_stream is not None and moved_stream.type != "rca":
             # RCA streams each have an associated source to output them due to hardware constraints
             if new_source is None:
@@ -313,7 +332,7 @@ class AmpliPiMediaPlayer(MediaPlayerEntity, CoordinatorEntity):
                     )
                 )
 
-                moved_zones = [z.id for z in state.zones if z.source_id == old_source]
+                moved_zones = [z.id for z in index.zones_by_source.get(old_source, [])]
                 await self._data_client.set_zones(
                     MultiZoneUpdate(
                         zones=moved_zones,
@@ -363,13 +382,13 @@ class AmpliPiMediaPlayer(MediaPlayerEntity, CoordinatorEntity):
 
     @property
     def available(self):
-        """Is the entity able to be used by the user? Should always return True so long as the entity is loaded."""
-        return self._available
+        """Is the entity able to be used by the user? True so long as the entity is loaded and the controller is answering."""
+        return self._available and self._data_client.controller_available
     
     @property
     def should_poll(self):
-        """Polling needed."""
-        return True
+        """State is pushed by the coordinator, so Home Assistant doesn't need to poll the entity on top of that."""
+        return False
     
     @property
     def entity_registry_enabled_default(self):
@@ -411,6 +430,7 @@ class AmpliPiSource(AmpliPiMediaPlayer):
         self._source = source
 
         self._id = source.id
+        self._kind = "source"
         self._domain = namespace
         self._image_base_path = image_base_path
         self._vendor = vendor
@@ -436,6 +456,7 @@ class AmpliPiSource(AmpliPiMediaPlayer):
         # Flipping the value of _is_off only effects what "@property state" later on outputs
         _LOGGER.info(f"Turning source {self._name} on")
         self._is_off = False
+        self._write_local_state()
 
     async def async_turn_off(self):
         if self._source is not None:
@@ -456,6 +477,7 @@ class AmpliPiSource(AmpliPiMediaPlayer):
                 )
             )
             self._is_off = True
+            self._write_local_state()
 
     async def async_mute_volume(self, mute):
         if mute is None:
@@ -480,10 +502,11 @@ class AmpliPiSource(AmpliPiMediaPlayer):
         
         group = next(filter(lambda z: z.vol_f is not None, self._groups), None)
         zone = next(filter(lambda z: z.vol_f is not None, self._zones), None)
+        # The models are shared with the coordinator data, so the new volume goes on copies that the next update replaces
         if group is not None:
-            group.vol_f = volume
+            self._groups = [group.model_copy(update={"vol_f": volume}) if g is group else g for g in self._groups]
         elif zone is not None:
-            zone.vol_f = volume
+            self._zones = [zone.model_copy(update={"vol_f": volume}) if z is zone else z for z in self._zones]
         
         await self._update_zones(
             MultiZoneUpdate(
@@ -544,7 +567,7 @@ class AmpliPiSource(AmpliPiMediaPlayer):
         else:
             # Process both the input and the known name in case the entity_id is sent back for processing
             stream_hacs_entity = self.get_entry_by_value(source)
-            stream_id = self.extract_amplipi_id_from_unique_id(stream_hacs_entity.unique_id)
+            stream_id = stream_hacs_entity.amplipi_id if isinstance(stream_hacs_entity, Stream) else None
             if stream_id is not None:
                 await self._data_client.set_source(
                     self._id,
@@ -573,37 +596,24 @@ class AmpliPiSource(AmpliPiMediaPlayer):
     def sync_state(self):
         """Retrieve latest state."""
         _LOGGER.info(f'Retrieving state for source {self._source.id}')
-        state = self._data_client.data
-        if state is not None:
-            try:
-                source = next(filter(lambda z: z.id == self._source.id, state.sources), None)
-                streams = state.streams
-            except Exception:
-                self._last_update_successful = False
-                _LOGGER.error(f'Could not update source {self._source.id}')
-                return
-
+        index = self._data_client.index
+        if index is not None:
+            source = index.sources.get(self._source.id)
             if not source:
                 self._last_update_successful = False
                 return
 
             self._source = source
-            self._streams = streams
-            self._stream = None
-
-            if 'stream=' in source.input and 'stream=local' not in source.input and self._streams is not None:
-                stream_id = int(self._source.input.split('=')[1])
-                self._stream = next(filter(lambda s: s.id == stream_id, self._streams), None)
+            self._streams = index.status.streams
+            self._stream = index.stream_on(source)
 
-            self._zones = list(filter(lambda z: z.source_id == self._source.id, state.zones))
-            self._groups = list(filter(lambda z: z.source_id == self._source.id, state.groups))
+            self._zones = index.zones_by_source.get(source.id, [])
+            self._groups = index.groups_by_source.get(source.id, [])
             self.get_song_info(self._source)
             self._last_update_successful = True
 
-    @property
-    def state(self):
-        """Update local states and return the media player state of the source."""
-        self.sync_state()
+    def _current_state(self) -> str:
+        """Media player state of the source, derived from what the last sync_state call pulled in"""
         
         if self._is_off and self._stream is None:
             return STATE_OFF
@@ -711,11 +721,13 @@ class AmpliPiZone(AmpliPiMediaPlayer):
 
         if group is not None:
             self._id = group.id
+            self._kind = "group"
             self._unique_id = group.unique_id
             self.entity_id = group.entity_id
             
         else:
             self._id = zone.id
+            self._kind = "zone"
             self._unique_id = zone.unique_id
             self.entity_id = zone.entity_id
 
@@ -765,6 +777,7 @@ class AmpliPiZone(AmpliPiMediaPlayer):
             _LOGGER.info(f"Turning zone {self.name} on")
             await self._update_zone(no_source_update)
         self._is_off = False
+        self._write_local_state()
 
     async def async_turn_off(self):
         # update zone/group to have a disconnected source state that indicates to HA that the zone/group is off
@@ -781,6 +794,7 @@ class AmpliPiZone(AmpliPiMediaPlayer):
             _LOGGER.info(f"Turning zone {self.name} off")
             await self._update_zone(source_off_update)
         self._is_off = True
+        self._write_local_state()
 
     async def async_mute_volume(self, mute):
         if mute is None:
@@ -804,10 +818,11 @@ class AmpliPiZone(AmpliPiMediaPlayer):
         if volume is None:
             return
         
+        # The models are shared with the coordinator data, so the new volume goes on copies that the next update replaces
         if self._group is not None:
-            self._group.vol_f = volume
+            self._group = self._group.model_copy(update={"vol_f": volume})
         elif self._zone is not None:
-            self._zone.vol_f = volume
+            self._zone = self._zone.model_copy(update={"vol_f": volume})
     
         _LOGGER.info(f"setting volume to {volume}")
         if self._group is not None:
@@ -842,7 +857,7 @@ class AmpliPiZone(AmpliPiMediaPlayer):
         via_device = None
 
         if self._source is not None:
-            via_device = (DOMAIN, f"{DOMAIN}_source_{self._source.id}")
+            via_device = (DOMAIN, f"{self._domain}_source_{self._source.id}")
 
         return DeviceInfo(
             identifiers={(DOMAIN, self.unique_id)},
@@ -857,28 +872,28 @@ class AmpliPiZone(AmpliPiMediaPlayer):
     def sync_state(self):
         """Retrieve latest state."""
         _LOGGER.info(f'Retrieving state for source {self._id}')
-        state = self._data_client.data
-        if state is not None:
+        index = self._data_client.index
+        if index is not None:
             zone = None
             group = None
             enabled = False
 
             try:
                 if self._group is not None:
-                    group: Group = next(filter(lambda z: z.id == self._id, state.groups), None)
+                    group: Group = index.groups.get(self._id)
                     if not group:
                         self._last_update_successful = False
                         return
-                    any_enabled_zone = next(filter(lambda z: z.id in group.zones, state.zones), None)
+                    members = index.group_zones.get(group.id, [])
 
-                    if any_enabled_zone is not None:
+                    if members:
                         enabled = True
 
-                    connected_sources = [state.zones[zone_index].source_id for zone_index in group.zones]
+                    connected_sources = [member.source_id for member in members]
                     # Is every zone connected to the same source?
                     self._split_group = len(set(connected_sources)) != 1
                 else:
-                    zone = next(filter(lambda z: z.id == self._id, state.zones), None)
+                    zone = index.zones.get(self._id)
                     if not zone:
                         self._last_update_successful = False
                         return
@@ -890,10 +905,9 @@ class AmpliPiZone(AmpliPiMediaPlayer):
 
 
             if self._group is not None:
-                for zone_id in self._group.zones:
-                    for state_zone in state.zones:
-                        if state_zone.id == zone_id and not state_zone.disabled:
-                            self._available = True
+                for member in index.group_zones.get(self._group.id, []):
+                    if not member.disabled:
+                        self._available = True
                 self._available = False
             elif self._zone is None or self._zone.disabled:
                 self._available = False
@@ -901,32 +915,29 @@ class AmpliPiZone(AmpliPiMediaPlayer):
 
             self._zone = zone
             self._group = group
-            self._streams = state.streams
-            self._sources = state.sources
+            self._streams = index.status.streams
+            self._sources = index.status.sources
             self._last_update_successful = True
             self._enabled = enabled
             self._source = None
 
             # When a zone is off it connects to source_id -2, groups also yield the source_id that all requisite zones are already connected to
             if self._group is not None:
-                self._source = next(filter(lambda s: self._group.source_id == s.id, state.sources), None)
+                self._source = index.sources.get(self._group.source_id)
                 self._is_off = self._group.source_id == -2
 
             elif self._zone.source_id is not None:
-                self._source = next(filter(lambda s: self._zone.source_id == s.id, state.sources), None)
+                self._source = index.sources.get(self._zone.source_id)
                 self._is_off = self._zone.source_id == -2
 
-            if self._source is not None and 'stream=' in self._source.input and 'stream=local' not in self._source.input:
-                stream_id = int(self._source.input.split('=')[1])
-                self._stream = next(filter(lambda z: z.id == stream_id, self._streams), None)
+            if self._source is not None and stream_id_of(self._source) is not None:
+                self._stream = index.stream_on(self._source)
 
             self.get_song_info(self._source)
             self._last_update_successful = True
 
-    @property
-    def state(self):
-        """Update local states and return the media player state of the zone or group."""
-        self.sync_state()
+    def _current_state(self) -> str:
+        """Media player state of the zone or group, derived from what the last sync_state call pulled in"""
         
         if self._is_off and self._source is None:
             return STATE_OFF
@@ -1066,25 +1077,17 @@ class AmpliPiZone(AmpliPiMediaPlayer):
 
     def _get_zone_ids(self) -> List[int]:
         if self._group is not None:
-            state = self._data_client.data
-            zone_ids = []
-
-            for zone_id in self._group.zones:
-                for state_zone in state.zones:
-                    if state_zone.id == zone_id and not state_zone.disabled:
-                        zone_ids.append(zone_id)
-            return zone_ids
+            return [
+                member.id
+                for member in self._data_client.index.group_zones.get(self._group.id, [])
+                if not member.disabled
+            ]
         else:
             return self._zone.id
 
     async def _update_available(self):
-        state = self._data_client.data
         if self._group is not None:
-            for zone_id in self._group.zones:
-                for state_zone in state.zones:
-                    if state_zone.id == zone_id and not state_zone.disabled:
-                        return True
-            return False
+            return any(not member.disabled for member in self._data_client.index.group_zones.get(self._group.id, []))
         elif self._zone is None or self._zone.disabled:
             return False
         return True
@@ -1093,8 +1096,8 @@ class AmpliPiAnnouncer(MediaPlayerEntity):
     # Doesn't need to extend AmpliPiMediaPlayer due to being far simpler than those components
     @property
     def should_poll(self):
-        """Polling needed."""
-        return True
+        """Nothing about the announcement channel comes from the controller, its state only changes when its volume is set."""
+        return False
 
     def __init__(self, namespace: str,
                  vendor: str, version: str, image_base_path: str,
@@ -1115,10 +1118,23 @@ class AmpliPiAnnouncer(MediaPlayerEntity):
         self._attr_name = self._name
         self._volume = 0.5
 
+    async def async_added_to_hass(self) -> None:
+        """Follow the controller's availability, which the coordinator only announces to its listeners"""
+        await super().async_added_to_hass()
+        self._written_available = self.available
+        self.async_on_remove(self._data_client.async_add_listener(self._handle_coordinator_update))
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        # Nothing else about the announcement channel comes from the controller, so only write state when availability flips
+        if self.available != self._written_available:
+            self._written_available = self.available
+            self.async_write_ha_state()
+
     @property
     def available(self):
-        return self._available
-    
+        return self._available and self._data_client.controller_available
+
     @property
     def supported_features(self):
         self._attr_app_name = "AmpliPi Announcement Channel"
@@ -1176,6 +1192,7 @@ class AmpliPiAnnouncer(MediaPlayerEntity):
         if volume is None:
             return
         self._volume = volume
+        self.async_write_ha_state()
 
 
 class AmpliPiStream(AmpliPiMediaPlayer):
@@ -1196,6 +1213,7 @@ class AmpliPiStream(AmpliPiMediaPlayer):
         self._domain = namespace
 
         self._id = stream.id
+        self._kind = "stream"
         self._name = stream.name
         self._attr_name = self._name
         self._unique_id = stream.unique_id
@@ -1244,6 +1262,7 @@ class AmpliPiStream(AmpliPiMediaPlayer):
                 await self.async_connect_stream_to_source(self._stream, goal_source)
 
         self._is_off = False
+        self._write_local_state()
 
     async def async_turn_off(self):
         try:
@@ -1267,6 +1286,7 @@ class AmpliPiStream(AmpliPiMediaPlayer):
             _LOGGER.debug(f"{self._name} had trouble disconnecting from a source")
         finally:
             self._is_off = True
+            self._write_local_state()
             
 
     async def async_mute_volume(self, mute):
@@ -1300,18 +1320,18 @@ class AmpliPiStream(AmpliPiMediaPlayer):
     def sync_state(self):
         """Retrieve latest state."""
         _LOGGER.info(f'Retrieving state for stream {self._id}')
-        state = self._data_client.data
-        if state is not None:
+        index = self._data_client.index
+        if index is not None:
             groups = []
             zones = []
 
             try:
-                stream = next(filter(lambda s: s.id == self._id, state.streams), None)
+                stream = index.streams.get(self._id)
                 if stream is not None:
-                    current_source = next((s for s in state.sources if s.input == f"stream={stream.id}"), None)
+                    current_source = index.source_by_stream.get(stream.id)
                     if current_source is not None:
-                        groups = [group for group in state.groups if group.source_id == current_source.id]
-                        zones = [zone for zone in state.zones if zone.source_id == current_source.id]
+                        groups = index.groups_by_source.get(current_source.id, [])
+                        zones = index.zones_by_source.get(current_source.id, [])
                 else:
                     self._last_update_successful = False
                     return
@@ -1323,7 +1343,7 @@ class AmpliPiStream(AmpliPiMediaPlayer):
             self._available = self._stream is not None
 
             self._stream = stream
-            self._sources = state.sources
+            self._sources = index.status.sources
             self._source = current_source
             if current_source: # Cannot be off while connected, but can be on while disconnected
                 self._is_off = False
@@ -1332,10 +1352,8 @@ class AmpliPiStream(AmpliPiMediaPlayer):
             self.get_song_info(self._source)
             self._last_update_successful = True
 
-    @property
-    def state(self):
-        """Update local states and return the media player state of the stream."""
-        self.sync_state()
+    def _current_state(self) -> str:
+        """Media player state of the stream, derived from what the last sync_state call pulled in"""
 
         if self._is_off and self._source is None:
             return STATE_OFF
@@ -1397,7 +1415,7 @@ class AmpliPiStream(AmpliPiMediaPlayer):
                 else:
                     entry = self.get_entry_by_value(source)
                     if entry:
-                        entry_id = self.extract_amplipi_id_from_unique_id(entry.unique_id)
+                        entry_id = entry.amplipi_id
                         if isinstance(amplipi_entity, Zone):
                             await self.async_connect_zones_to_stream(self._stream, [entry_id], None)
                         elif isinstance(amplipi_entity, Group):
@@ -0,0 +1,161 @@
+"""
+    Timing instrumentation for the AmpliPi data coordinator
+    Each phase of a refresh and every write to the controller is timed with the monotonic clock and counted into a rolling histogram,
+    so the diagnostics download and the optional sensors can show whether AmpliPi is what's slowing Home Assistant down
+"""
+import asyncio
+from functools import wraps
+from time import monotonic
+from typing import Callable, Optional
+
+from .const import METRICS_WINDOW, METRICS_SLICES
+
+# Upper bounds of the histogram buckets in milliseconds, anything slower lands in the last (unbounded) bucket
+BUCKET_BOUNDS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+PHASE_FETCH = "fetch"
+PHASE_ENRICH = "enrich"
+# Building the models of changed objects and validating the Status they make up are timed apart, both happen within enrich
+PHASE_BUILD = "build"
+PHASE_VALIDATE = "validate"
+PHASE_DISPATCH = "dispatch"
+PHASE_COMMAND = "command"
+
+
+class _Slice:
+    __slots__ = ("number", "counts", "errors", "total")
+
+    def __init__(self, number: int):
+        # Slices are numbered by how many slice lengths of the monotonic clock have passed
+        self.number = number
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.errors: int = 0
+        self.total: float = 0
+
+
+class RollingHistogram:
+    """
+        Counts of durations in fixed buckets over the last `window` seconds\n
+        The window is split into `slices` equal parts that are reused in turn, so recording is a couple of list lookups and memory never grows
+    """
+
+    def __init__(self, window: float = METRICS_WINDOW, slices: int = METRICS_SLICES):
+        self.window = window
+        self.slice_length = window / slices
+        self._slices: list[Optional[_Slice]] = [None] * slices
+
+    def _current(self, now: float) -> _Slice:
+        number = int(now // self.slice_length)
+        position = number % len(self._slices)
+        current = self._slices[position]
+        if current is None or current.number != number:
+            current = self._slices[position] = _Slice(number)
+        return current
+
+    def record(self, seconds: float, success: bool = True) -> None:
+        current = self._current(monotonic())
+        milliseconds = seconds * 1000
+        bucket = next((index for index, bound in enumerate(BUCKET_BOUNDS_MS) if milliseconds <= bound), len(BUCKET_BOUNDS_MS))
+        current.counts[bucket] += 1
+        current.total += milliseconds
+        if not success:
+            current.errors += 1
+
+    def _live(self) -> list[_Slice]:
+        oldest = int(monotonic() // self.slice_length) - len(self._slices) + 1
+        return [current for current in self._slices if current is not None and current.number >= oldest]
+
+    def summary(self) -> dict:
+        live = self._live()
+        counts = [sum(current.counts[bucket] for current in live) for bucket in range(len(BUCKET_BOUNDS_MS) + 1)]
+        count = sum(counts)
+        errors = sum(current.errors for current in live)
+        return {
+            "count": count,
+            "errors": errors,
+            "error_rate": round(errors / count, 3) if count else None,
+            "mean_ms": round(sum(current.total for current in live) / count, 1) if count else None,
+            "p50_ms": self._percentile(counts, count, 0.5),
+            "p95_ms": self._percentile(counts, count, 0.95),
+            "p99_ms": self._percentile(counts, count, 0.99),
+            "buckets": {
+                f"<={bound}ms" if bound is not None else f">{BUCKET_BOUNDS_MS[-1]}ms": total
+                for bound, total in zip((*BUCKET_BOUNDS_MS, None), counts)
+            },
+        }
+
+    @staticmethod
+    def _percentile(counts: list[int], count: int, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket the percentile falls in, None past the last bound or without samples"""
+        if not count:
+            return None
+        target = fraction * count
+        seen = 0
+        for bound, total in zip(BUCKET_BOUNDS_MS, counts):
+            seen += total
+            if seen >= target:
+                return bound
+        return None
+
+
+class _Timer:
+    __slots__ = ("_metrics", "_phase", "_started")
+
+    def __init__(self, metrics: "CoordinatorMetrics", phase: str):
+        self._metrics = metrics
+        self._phase = phase
+
+    def __enter__(self):
+        self._started = monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._metrics.record(self._phase, monotonic() - self._started, exc_type is None)
+        return False
+
+
+class CoordinatorMetrics:
+    """A rolling histogram per phase, created the first time each phase is recorded"""
+
+    def __init__(self, window: float = METRICS_WINDOW, slices: int = METRICS_SLICES):
+        self.window = window
+        self.slices = slices
+        self.phases: dict[str, RollingHistogram] = {}
+
+    def record(self, phase: str, seconds: float, success: bool = True) -> None:
+        histogram = self.phases.get(phase)
+        if histogram is None:
+            histogram = self.phases[phase] = RollingHistogram(self.window, self.slices)
+        histogram.record(seconds, success)
+
+    def time(self, phase: str) -> _Timer:
+        """Context manager that records how long its body took, and whether it raised, under the given phase"""
+        return _Timer(self, phase)
+
+    def summary(self, phase: str) -> Optional[dict]:
+        histogram = self.phases.get(phase)
+        return histogram.summary() if histogram is not None else None
+
+    def diagnostics(self) -> dict:
+        return {
+            "window": self.window,
+            "phases": {phase: histogram.summary() for phase, histogram in sorted(self.phases.items())},
+        }
+
+
+def timed(phase: str):
+    """Record every call of a coordinator method (sync or async) under the given phase of its metrics"""
+    def decorator(func: Callable):
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(self, *args, **kwargs):
+                with self.metrics.time(phase):
+                    return await func(self, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.time(phase):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List, Optional, Union
 from pydantic import BaseModel
 from pyamplipi.models import Source as PySource, Stream as PyStream, Group as PyGroup, Zone as PyZone, Status as PyStatus
 
@@ -8,6 +8,12 @@ class AmpliPiHAEntity(BaseModel):
     unique_id: str
     friendly_name: str
     entity_id: str
+    # Parsed out of the unique_id once at build time, ie. ("stream", 1000) for amplipi_stream_1000
+    amplipi_kind: str
+    amplipi_id: int
+
+# Fields that the enriched models add on top of the pyamplipi ones
+HA_FIELDS = frozenset(AmpliPiHAEntity.model_fields)
 
 class Source(PySource, AmpliPiHAEntity):
     """An audio source\nAlso includes some encoding relating to HomeAssistant, including the original name and unique id of the related entity"""
@@ -26,6 +32,61 @@ class Status(PyStatus):
     """Collection of PyAmpliPi objects with the PyAmpliPiExtension mixin that allows calls to GET /api to have home assistant entity data encoded within"""
     sources: List[Source] = []
     zones: List[Zone] = []
-    group: List[Group] = []
-    stream: List[Stream] = []
-    
\ No newline at end of file
+    groups: List[Group] = []
+    streams: List[Stream] = []
+
+
+def stream_id_of(source: PySource) -> Optional[int]:
+    """The id of the stream a source is connected to, or None if its input is not a stream (ie. "local" or "None")"""
+    if source.input is not None and source.input.startswith("stream=") and source.input[7:].isdigit():
+        return int(source.input[7:])
+    return None
+
+
+class StatusIndex:
+    """
+        Id-keyed views over a Status, built once per refresh so that entities can find their AmpliPi objects without scanning every list\n
+        Also holds the reverse lookups that entities need to find related objects: source to zones and groups, stream to source and group to zones
+    """
+
+    def __init__(self, status: Status):
+        self.status = status
+        self.sources: Dict[int, Source] = {source.id: source for source in status.sources}
+        self.zones: Dict[int, Zone] = {zone.id: zone for zone in status.zones}
+        self.groups: Dict[int, Group] = {group.id: group for group in status.groups}
+        self.streams: Dict[int, Stream] = {stream.id: stream for stream in status.streams}
+
+        self.zones_by_source: Dict[int, List[Zone]] = {}
+        for zone in status.zones:
+            self.zones_by_source.setdefault(zone.source_id, []).append(zone)
+
+        self.groups_by_source: Dict[int, List[Group]] = {}
+        for group in status.groups:
+            self.groups_by_source.setdefault(group.source_id, []).append(group)
+
+        # If more than one source claims a stream, the first one wins like it did with a linear search
+        self.source_by_stream: Dict[int, Source] = {}
+        for source in status.sources:
+            stream_id = stream_id_of(source)
+            if stream_id is not None:
+                self.source_by_stream.setdefault(stream_id, source)
+
+        self.group_zones: Dict[int, List[Zone]] = {
+            group.id: [self.zones[zone_id] for zone_id in group.zones if zone_id in self.zones]
+            for group in status.groups
+        }
+
+        # Every name an entity can be referred to by, in the order that get_entry_by_value has always searched: sources, zones, groups, streams
+        self.by_value: Dict[str, Union[Source, Zone, Group, Stream]] = {}
+        for entries in (status.sources, status.zones, status.groups, status.streams):
+            for entry in entries:
+                for value in (entry.name, entry.original_name, entry.friendly_name, entry.entity_id, entry.unique_id):
+                    if value is not None:
+                        self.by_value.setdefault(value, entry)
+
+    def stream_on(self, source: Optional[PySource]) -> Optional[Stream]:
+        """The stream that a source is connected to, if any"""
+        if source is None:
+            return None
+        stream_id = stream_id_of(source)
+        return self.streams.get(stream_id) if stream_id is not None else None
@@ -0,0 +1,105 @@
+"""
+    On-demand profiling of the AmpliPi integration
+    The amplipi.profile service runs cProfile on the event loop thread for a number of coordinator refreshes or for a fixed number of seconds,
+    which covers set_data, every entity's sync_state and any writes made in the meantime, and saves a sorted report plus the raw pstats file
+    into the config directory so hot spots can be captured on a running install
+"""
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+from datetime import datetime
+from typing import Optional
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+
+from .const import DOMAIN, AMPLIPI_OBJECT, SERVICE_PROFILE, ATTR_CYCLES, ATTR_DURATION, ATTR_REBUILD, DEFAULT_PROFILE_CYCLES, PROFILE_REPORT_LINES
+
+_LOGGER = logging.getLogger(__name__)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_CYCLES): vol.All(vol.Coerce(int), vol.Range(min=1, max=1000)),
+        vol.Optional(ATTR_DURATION): vol.All(vol.Coerce(float), vol.Range(min=1, max=3600)),
+        vol.Optional(ATTR_REBUILD, default=False): cv.boolean,
+    }
+)
+
+# Only one profiler can be attached to a thread at a time
+_running = asyncio.Lock()
+
+
+def _write_report(profile: cProfile.Profile, report_path: str, stats_path: str, description: str) -> None:
+    """Sorted report (integration functions first, then everything) and the raw stats for snakeviz, pstats and the like"""
+    profile.dump_stats(stats_path)
+
+    stream = io.StringIO()
+    stream.write(f"AmpliPi profile, {description}\n\n")
+    stats = pstats.Stats(profile, stream=stream)
+    stream.write("=== AmpliPi integration, by cumulative time ===\n")
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(f"custom_components[/\\\\]{DOMAIN}", PROFILE_REPORT_LINES)
+    stream.write("\n=== AmpliPi integration, by own time ===\n")
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(f"custom_components[/\\\\]{DOMAIN}", PROFILE_REPORT_LINES)
+    stream.write("\n=== Everything on the event loop, by cumulative time ===\n")
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_REPORT_LINES)
+
+    with open(report_path, "w") as report:
+        report.write(stream.getvalue())
+
+
+async def async_profile(hass: HomeAssistant, cycles: int = DEFAULT_PROFILE_CYCLES, duration: Optional[float] = None, rebuild: bool = False) -> dict:
+    """
+        Profile every loaded controller for `cycles` refreshes, or for `duration` seconds of whatever happens to be going on\n
+        rebuild forgets the previous payloads before each refresh, so that every object is rebuilt and every entity syncs as on a first poll
+    """
+    coordinators = [entry[AMPLIPI_OBJECT] for entry in hass.data.get(DOMAIN, {}).values()]
+    if not coordinators:
+        raise HomeAssistantError("No AmpliPi controllers are loaded")
+    if _running.locked():
+        raise HomeAssistantError("A profile is already being taken")
+
+    async with _running:
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            if duration is not None:
+                await asyncio.sleep(duration)
+                description = f"{duration:g} seconds"
+            else:
+                for _ in range(cycles):
+                    for coordinator in coordinators:
+                        if rebuild:
+                            coordinator.invalidate_built()
+                        await coordinator.async_refresh()
+                        if rebuild:
+                            # Rebuilt models compare equal to the old ones, so the coordinator won't have woken the entities up itself
+                            coordinator.affected = None
+                            coordinator.async_update_listeners()
+                description = f"{cycles} refreshes of {len(coordinators)} controller(s){', rebuilding everything' if rebuild else ''}"
+        finally:
+            profile.disable()
+
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    report_path = hass.config.path(f"{DOMAIN}_profile_{stamp}.txt")
+    stats_path = hass.config.path(f"{DOMAIN}_profile_{stamp}.pstats")
+    await hass.async_add_executor_job(_write_report, profile, report_path, stats_path, description)
+    _LOGGER.info("AmpliPi profile of %s written to %s and %s", description, report_path, stats_path)
+    return {"report": report_path, "stats": stats_path}
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration's services, called once from async_setup"""
+    async def handle_profile(call: ServiceCall) -> ServiceResponse:
+        return await async_profile(
+            hass,
+            cycles=call.data.get(ATTR_CYCLES, DEFAULT_PROFILE_CYCLES),
+            duration=call.data.get(ATTR_DURATION),
+            rebuild=call.data[ATTR_REBUILD],
+        )
+
+    hass.services.async_register(DOMAIN, SERVICE_PROFILE, handle_profile, schema=PROFILE_SCHEMA, supports_response=SupportsResponse.OPTIONAL)
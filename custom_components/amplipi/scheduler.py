@@ -0,0 +1,184 @@
+"""
+    Adaptive polling for the AmpliPi data coordinator
+    Polls quickly while the user is interacting with the system or music is playing, and backs off while everything is off.
+    When several controllers are set up, their polls are spread out in time by a stagger that every coordinator shares
+"""
+import asyncio
+from collections import deque
+from datetime import timedelta
+from statistics import median
+from time import monotonic
+from typing import Callable, Optional
+
+from .const import POLL_INTERVAL, FAST_POLL_INTERVAL, FAST_POLL_WINDOW, IDLE_POLL_INTERVAL, POLL_SPACING
+from .models import Status
+
+POLICY_COMMAND = "command"
+POLICY_PLAYING = "playing"
+POLICY_NORMAL = "normal"
+POLICY_IDLE = "idle"
+POLICY_BACKOFF = "backoff"
+
+
+class AdaptivePollScheduler:
+    """Decides how long the coordinator waits before its next poll"""
+
+    def __init__(
+        self,
+        fast_interval: float = FAST_POLL_INTERVAL,
+        normal_interval: float = POLL_INTERVAL,
+        idle_interval: float = IDLE_POLL_INTERVAL,
+        fast_window: float = FAST_POLL_WINDOW,
+    ):
+        self.fast_interval = fast_interval
+        self.normal_interval = normal_interval
+        self.idle_interval = idle_interval
+        self.fast_window = fast_window
+
+        self.policy: str = POLICY_NORMAL
+        self.interval: float = normal_interval
+        self._fast_until: float = 0
+        self._idle_steps: int = 0
+        self.backoff: Optional[float] = None
+
+    @property
+    def update_interval(self) -> timedelta:
+        return timedelta(seconds=self.interval)
+
+    def note_command(self) -> timedelta:
+        """A user command was sent, poll quickly for a while to pick up its effects. A controller that is down stays on its backoff"""
+        self._fast_until = monotonic() + self.fast_window
+        self._idle_steps = 0
+        return self.update(None)
+
+    def set_backoff(self, backoff: Optional[float]) -> timedelta:
+        """While the controller is down, wait backoff seconds between polls regardless of anything else. None goes back to the usual policies"""
+        self.backoff = backoff
+        return self.update(None)
+
+    def update(self, status: Optional[Status]) -> timedelta:
+        """Pick the next interval after a refresh produced the given status"""
+        if self.backoff is not None:
+            return self._set(POLICY_BACKOFF, self.backoff)
+
+        if monotonic() < self._fast_until:
+            return self._set(POLICY_COMMAND, self.fast_interval)
+
+        if status is None:
+            return self._set(POLICY_NORMAL, self.normal_interval)
+
+        if any(source.info is not None and source.info.state == "playing" for source in status.sources):
+            self._idle_steps = 0
+            return self._set(POLICY_PLAYING, self.fast_interval)
+
+        if status.zones and all(zone.source_id == -2 for zone in status.zones):
+            # Double the interval every poll that finds the system still off, up to idle_interval
+            interval = min(self.idle_interval, self.normal_interval * 2 ** self._idle_steps)
+            if interval < self.idle_interval:
+                self._idle_steps += 1
+            return self._set(POLICY_IDLE, interval)
+
+        self._idle_steps = 0
+        return self._set(POLICY_NORMAL, self.normal_interval)
+
+    def _set(self, policy: str, interval: float) -> timedelta:
+        self.policy = policy
+        self.interval = interval
+        return self.update_interval
+
+    def diagnostics(self) -> dict:
+        return {
+            "policy": self.policy,
+            "interval": self.interval,
+            "backoff": self.backoff,
+            "fast_window_remaining": max(0.0, self._fast_until - monotonic()),
+            "idle_steps": self._idle_steps,
+            "settings": {
+                "fast_interval": self.fast_interval,
+                "normal_interval": self.normal_interval,
+                "idle_interval": self.idle_interval,
+                "fast_window": self.fast_window,
+            },
+        }
+
+
+# Poll durations kept per controller for the diagnostics
+POLL_SAMPLES = 100
+
+
+class _Controller:
+    __slots__ = ("name", "polls", "failures", "delayed", "latencies")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.polls: int = 0
+        self.failures: int = 0
+        self.delayed: int = 0
+        self.latencies: deque[float] = deque(maxlen=POLL_SAMPLES)
+
+
+class PollStagger:
+    """
+        Shared by the coordinators of every controller, holds each poll back until at least `spacing` seconds after the previous one started\n
+        Coordinators that end up due at the same moment (ie. after a restart) are pushed apart, and since each one schedules its next poll
+        from when its last one finished they stay apart afterwards. A single controller is never held back
+    """
+
+    def __init__(self, spacing: float = POLL_SPACING):
+        self.spacing = spacing
+        self._controllers: dict[str, _Controller] = {}
+        self._next_slot: float = 0
+
+    def register(self, key: str, name: str) -> Callable[[], None]:
+        """Add a controller, returns the callback that removes it again"""
+        self._controllers[key] = _Controller(name)
+
+        def unregister() -> None:
+            # Returns nothing, as config entries await anything their unload callbacks return
+            self._controllers.pop(key, None)
+        return unregister
+
+    async def async_wait(self, key: str) -> None:
+        """Wait for the next free slot before polling the given controller"""
+        if len(self._controllers) < 2:
+            return
+
+        now = monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.spacing
+        if slot > now:
+            controller = self._controllers.get(key)
+            if controller is not None:
+                controller.delayed += 1
+            await asyncio.sleep(slot - now)
+
+    def record(self, key: str, seconds: float, success: bool) -> None:
+        """Note how long a poll of the given controller took"""
+        controller = self._controllers.get(key)
+        if controller is None:
+            return
+        controller.polls += 1
+        if success:
+            controller.latencies.append(seconds)
+        else:
+            controller.failures += 1
+
+    def diagnostics(self) -> dict:
+        controllers = {}
+        for key, controller in self._controllers.items():
+            latencies = sorted(controller.latencies)
+            controllers[key] = {
+                "name": controller.name,
+                "polls": controller.polls,
+                "failures": controller.failures,
+                "delayed": controller.delayed,
+                "poll_latency_ms": {
+                    "median": round(median(latencies) * 1000, 1),
+                    "p95": round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+                    "max": round(latencies[-1] * 1000, 1),
+                } if latencies else None,
+            }
+        return {
+            "spacing": self.spacing,
+            "controllers": controllers,
+        }
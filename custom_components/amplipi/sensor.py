@@ -0,0 +1,69 @@
+"""
+    Timing sensors for the AmpliPi integration
+    Poll latency, command latency and error rate from the coordinator's metrics, disabled by default since they're only needed
+    when tracking down whether AmpliPi is what's slowing Home Assistant down
+"""
+from datetime import timedelta
+from typing import Callable, Optional
+
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.const import EntityCategory, PERCENTAGE, UnitOfTime
+
+from .const import DOMAIN, AMPLIPI_OBJECT, METRICS_SENSOR_INTERVAL
+from .coordinator import AmpliPiDataClient
+from .metrics import PHASE_FETCH, PHASE_COMMAND
+
+SCAN_INTERVAL = timedelta(seconds=METRICS_SENSOR_INTERVAL)
+
+
+def _error_rate(coordinator: AmpliPiDataClient) -> Optional[float]:
+    """Share of polls and commands in the metrics window that failed"""
+    summaries = [summary for summary in (coordinator.metrics.summary(PHASE_FETCH), coordinator.metrics.summary(PHASE_COMMAND)) if summary]
+    count = sum(summary["count"] for summary in summaries)
+    if not count:
+        return None
+    return round(sum(summary["errors"] for summary in summaries) / count * 100, 1)
+
+
+def _mean(phase: str) -> Callable[[AmpliPiDataClient], Optional[float]]:
+    def value(coordinator: AmpliPiDataClient) -> Optional[float]:
+        summary = coordinator.metrics.summary(phase)
+        return summary["mean_ms"] if summary else None
+    return value
+
+
+# Key, name, unit and how the value is worked out of the coordinator
+SENSORS = (
+    ("poll_latency", "Poll latency", UnitOfTime.MILLISECONDS, _mean(PHASE_FETCH)),
+    ("command_latency", "Command latency", UnitOfTime.MILLISECONDS, _mean(PHASE_COMMAND)),
+    ("error_rate", "Error rate", PERCENTAGE, _error_rate),
+)
+
+
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Set up the AmpliPi timing sensors"""
+    coordinator: AmpliPiDataClient = hass.data[DOMAIN][config_entry.entry_id][AMPLIPI_OBJECT]
+    async_add_entities(
+        AmpliPiMetricSensor(coordinator, config_entry.title, key, name, unit, value)
+        for key, name, unit, value in SENSORS
+    )
+
+
+class AmpliPiMetricSensor(SensorEntity):
+    """Averages a phase of the coordinator's metrics over the metrics window, read on its own slow interval rather than on every refresh"""
+
+    _attr_should_poll = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, coordinator: AmpliPiDataClient, title: str, key: str, name: str, unit: str,
+                 value: Callable[[AmpliPiDataClient], Optional[float]]):
+        self._coordinator = coordinator
+        self._value = value
+        self._attr_name = f"{title} {name}"
+        self._attr_unique_id = f"{coordinator.entity_prefix}_{key}"
+        self._attr_native_unit_of_measurement = unit
+
+    async def async_update(self) -> None:
+        self._attr_native_value = self._value(self._coordinator)
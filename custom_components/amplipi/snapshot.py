@@ -0,0 +1,44 @@
+"""
+    On-disk snapshot of the last status fetched from an AmpliPi controller
+    Lets the integration create its entities on startup without waiting for the controller to answer
+"""
+import logging
+from typing import Callable, Optional
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, SNAPSHOT_SAVE_DELAY
+from .models import Status
+
+_LOGGER = logging.getLogger(__name__)
+
+# Bump whenever the enriched models change shape, older snapshots are then ignored rather than migrated
+STORAGE_VERSION = 1
+
+
+class StatusSnapshot:
+    """The enriched Status of one config entry, entity ids and friendly names included, kept in Home Assistant's .storage directory"""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str):
+        self._store: Store[dict] = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.status")
+
+    async def async_load(self) -> Optional[Status]:
+        """The Status from the last run, or None if there isn't a usable one"""
+        try:
+            data = await self._store.async_load()
+            return Status.model_validate(data) if data is not None else None
+        except Exception as e:  # pylint: disable=broad-except
+            # A snapshot only ever saves time, so any problem with it just means starting the slow way
+            _LOGGER.debug(f"Ignoring AmpliPi status snapshot: {e}")
+            return None
+
+    def async_delay_save(self, get_status: Callable[[], Status], delay: float = SNAPSHOT_SAVE_DELAY) -> None:
+        """
+            Write the snapshot once delay seconds have passed, any further calls before then are folded into the same write\n
+            get_status is only called when the write happens, and Home Assistant flushes a pending write when it stops
+        """
+        self._store.async_delay_save(lambda: get_status().model_dump(mode="json"), delay)
+
+    async def async_remove(self) -> None:
+        await self._store.async_remove()
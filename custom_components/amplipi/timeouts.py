@@ -0,0 +1,72 @@
+"""
+    Timeout budgets and failure handling for requests to an AmpliPi controller
+    Keeps a controller that stopped answering from tying up the coordinator, and backs polling off until it answers again
+"""
+from time import monotonic
+from typing import Optional
+
+from .const import POLL_TIMEOUT, COMMAND_TIMEOUT, FAILURE_THRESHOLD, POLL_INTERVAL, MAX_BACKOFF_INTERVAL
+
+
+class TimeoutPolicy:
+    """Seconds that each kind of request (a poll or a user command) may take, the first refresh during setup is a poll"""
+
+    def __init__(self, poll: float = POLL_TIMEOUT, command: float = COMMAND_TIMEOUT):
+        self.poll = poll
+        self.command = command
+
+    def diagnostics(self) -> dict:
+        return {"poll": self.poll, "command": self.command}
+
+
+class CircuitBreaker:
+    """
+        Counts failed polls in a row, once threshold of them have failed the breaker opens and the controller is treated as down until a poll succeeds\n
+        Every failure past the threshold doubles the wait before the next poll, up to max_interval
+    """
+
+    def __init__(self, threshold: int = FAILURE_THRESHOLD, base_interval: float = POLL_INTERVAL, max_interval: float = MAX_BACKOFF_INTERVAL):
+        self.threshold = threshold
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+
+        self.failures: int = 0
+        self.trips: int = 0
+        self._opened_at: Optional[float] = None
+
+    @property
+    def open(self) -> bool:
+        return self.failures >= self.threshold
+
+    @property
+    def backoff(self) -> Optional[float]:
+        """Seconds to wait before the next poll while the breaker is open, None while it's closed"""
+        if not self.open:
+            return None
+        return min(self.max_interval, self.base_interval * 2 ** (self.failures - self.threshold + 1))
+
+    def record_success(self) -> bool:
+        """Returns True if this success closed the breaker"""
+        was_open = self.open
+        self.failures = 0
+        self._opened_at = None
+        return was_open
+
+    def record_failure(self) -> bool:
+        """Returns True if this failure opened the breaker"""
+        self.failures += 1
+        if self.failures == self.threshold:
+            self.trips += 1
+            self._opened_at = monotonic()
+            return True
+        return False
+
+    def diagnostics(self) -> dict:
+        return {
+            "open": self.open,
+            "consecutive_failures": self.failures,
+            "threshold": self.threshold,
+            "backoff": self.backoff,
+            "open_for": monotonic() - self._opened_at if self._opened_at is not None else None,
+            "trips": self.trips,
+        }
@@ -0,0 +1,126 @@
+"""Fixtures shared by the AmpliPi tests"""
+import asyncio
+import copy
+from unittest.mock import patch
+
+import pytest
+from aiohttp import ThreadedResolver
+from homeassistant.const import CONF_HOST, CONF_ID, CONF_NAME, CONF_PORT
+from homeassistant.core import HomeAssistant
+from pyamplipi.amplipi import AmpliPi
+from pyamplipi.models import MultiZoneUpdate, Source as PySource, SourceUpdate, Status as PyStatus
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.amplipi.const import DOMAIN, AMPLIPI_OBJECT, CONF_VENDOR, CONF_VERSION, CONF_WEBAPP, CONF_API_PATH
+
+HOST = "127.0.0.1"
+PORT = 5000
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    yield
+
+
+def make_status(zones: int = 6) -> dict:
+    """A GET /api payload for a controller with the given number of zones, all of them off"""
+    return {
+        "sources": [
+            {"id": source_id, "name": f"Input {source_id + 1}", "input": "None", "info": {"name": "None", "state": "stopped", "supported_cmds": []}}
+            for source_id in range(4)
+        ],
+        "zones": [
+            {"id": zone_id, "name": f"Zone {zone_id + 1}", "source_id": -2, "mute": True, "vol": -80, "vol_f": 0.0, "vol_min": -80, "vol_max": 0, "disabled": False}
+            for zone_id in range(zones)
+        ],
+        "groups": [
+            {"id": 100, "name": "All Zones", "source_id": -2, "zones": list(range(zones)), "mute": True, "vol_delta": -80, "vol_f": 0.0}
+        ],
+        "streams": [
+            {"id": 1000, "name": "Internet Radio 1", "type": "internetradio"},
+        ],
+        "presets": [],
+        "info": {"version": "0.4.7", "config_file": "house.json", "mock_ctrl": True, "mock_streams": True},
+    }
+
+
+class FakeController:
+    """Stands in for the controller's API, answers with a copy of status or raises error while one is set. Every write is recorded in calls"""
+
+    def __init__(self):
+        self.status = make_status()
+        self.error = None
+        self.calls: list[tuple] = []
+
+    async def get_status(self, *args, **kwargs) -> PyStatus:
+        # Give way to the event loop like a real request would, so that concurrent callers interleave
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        return PyStatus.model_validate(copy.deepcopy(self.status))
+
+    async def get_sources(self, *args, **kwargs) -> list[PySource]:
+        return (await self.get_status()).sources
+
+    async def set_source(self, source_id: int, update: SourceUpdate) -> PyStatus:
+        await asyncio.sleep(0)
+        self.calls.append(("set_source", source_id, update))
+        next(source for source in self.status["sources"] if source["id"] == source_id).update(update.model_dump(exclude_none=True))
+        return await self.get_status()
+
+    async def set_zones(self, update: MultiZoneUpdate) -> PyStatus:
+        await asyncio.sleep(0)
+        self.calls.append(("set_zones", update))
+        zone_ids = set(update.zones or ())
+        for group in self.status["groups"]:
+            if group["id"] in (update.groups or ()):
+                zone_ids.update(group["zones"])
+        for zone in self.status["zones"]:
+            if zone["id"] in zone_ids:
+                zone.update(update.update.model_dump(exclude_none=True))
+        return await self.get_status()
+
+
+@pytest.fixture
+def controller():
+    fake = FakeController()
+    # aiodns leaves a thread behind when the controller's or Home Assistant's connection pool closes, which the test cleanup
+    # checks don't allow, and nothing here resolves a name anyway
+    with patch.object(AmpliPi, "get_status", fake.get_status), \
+            patch.object(AmpliPi, "get_sources", fake.get_sources), \
+            patch.object(AmpliPi, "set_source", fake.set_source), \
+            patch.object(AmpliPi, "set_zones", fake.set_zones), \
+            patch("aiohttp.connector.DefaultResolver", ThreadedResolver), \
+            patch("homeassistant.helpers.aiohttp_client.AsyncResolver", ThreadedResolver):
+        yield fake
+
+
+@pytest.fixture
+async def config_entry(hass: HomeAssistant, controller) -> MockConfigEntry:
+    """An AmpliPi config entry that has been set up against the fake controller"""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title="AmpliPi",
+        unique_id=f"{HOST}:{PORT}",
+        data={
+            CONF_NAME: "AmpliPi",
+            CONF_HOST: HOST,
+            CONF_PORT: PORT,
+            CONF_ID: f"{HOST}:{PORT}",
+            CONF_VENDOR: "Unknown",
+            CONF_VERSION: "Unknown",
+            CONF_WEBAPP: f"http://{HOST}",
+            CONF_API_PATH: "/api",
+        },
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    yield entry
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+@pytest.fixture
+def coordinator(hass: HomeAssistant, config_entry):
+    return hass.data[DOMAIN][config_entry.entry_id][AMPLIPI_OBJECT]
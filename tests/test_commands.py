@@ -0,0 +1,36 @@
+"""Tests for coalescing and batching zone updates"""
+import asyncio
+from time import perf_counter
+
+from homeassistant.core import HomeAssistant
+from pyamplipi.models import MultiZoneUpdate, ZoneUpdate
+
+from custom_components.amplipi.commands import ZoneUpdateBatcher, ZoneUpdateCoalescer
+
+
+def busy(seconds: float) -> None:
+    """Hold the event loop like the work a service call does for each entity, without giving way to it"""
+    started = perf_counter()
+    while perf_counter() - started < seconds:
+        pass
+
+
+async def test_updates_for_different_zones_in_one_tick_are_sent_together(hass: HomeAssistant):
+    sent: list[MultiZoneUpdate] = []
+
+    async def send(update: MultiZoneUpdate):
+        sent.append(update)
+
+    coalescer = ZoneUpdateCoalescer(hass, 0.01)
+    batcher = ZoneUpdateBatcher(hass, send)
+    submitted = []
+    for zone_id in range(6):
+        submitted.append(hass.async_create_task(
+            coalescer.submit(("zone", zone_id), ZoneUpdate(source_id=1), lambda update, zone_id=zone_id: batcher.submit(update, zones=[zone_id])),
+            eager_start=True,
+        ))
+        busy(0.002)
+    await asyncio.gather(*submitted)
+
+    assert len(sent) == 1
+    assert sorted(sent[0].zones) == list(range(6))
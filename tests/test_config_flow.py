@@ -0,0 +1,46 @@
+"""Tests for the AmpliPi config flow"""
+from ipaddress import ip_address
+
+from homeassistant import config_entries
+from homeassistant.components import zeroconf
+from homeassistant.const import CONF_HOST, CONF_PORT
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+
+from custom_components.amplipi.const import DOMAIN
+
+from .conftest import HOST, PORT
+
+
+def discovery(host: str = HOST, port: int = PORT) -> zeroconf.ZeroconfServiceInfo:
+    return zeroconf.ZeroconfServiceInfo(
+        ip_address=ip_address(host),
+        ip_addresses=[ip_address(host)],
+        hostname="amplipi.local.",
+        name="amplipi._amplipi._tcp.local.",
+        port=port,
+        type="_amplipi._tcp.local.",
+        properties={"name": "AmpliPi", "vendor": "MicroNova", "version": "0.4.7", "web_app": f"http://{host}", "path": "/api"},
+    )
+
+
+async def test_discovering_a_controller_added_by_hand_aborts(hass: HomeAssistant, config_entry):
+    result = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_ZEROCONF}, data=discovery())
+    assert result["type"] == FlowResultType.ABORT
+    assert result["reason"] == "already_configured"
+
+
+async def test_adding_a_discovered_controller_by_hand_aborts(hass: HomeAssistant, controller):
+    result = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_ZEROCONF}, data=discovery())
+    result = await hass.config_entries.flow.async_configure(result["flow_id"], {CONF_HOST: HOST, CONF_PORT: PORT})
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    await hass.async_block_till_done()
+
+    result = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER}, data={CONF_HOST: HOST, CONF_PORT: PORT})
+    assert result["type"] == FlowResultType.ABORT
+    assert result["reason"] == "already_configured"
+    assert len(hass.config_entries.async_entries(DOMAIN)) == 1
+
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
@@ -0,0 +1,107 @@
+"""Tests for the AmpliPi data coordinator"""
+import asyncio
+from unittest.mock import patch
+
+from aiohttp import ClientError
+from homeassistant.const import EVENT_STATE_CHANGED, STATE_UNAVAILABLE
+from homeassistant.core import HomeAssistant
+from pyamplipi.amplipi import AmpliPi
+from pyamplipi.models import MultiZoneUpdate, ZoneUpdate
+
+
+def amplipi_states(hass: HomeAssistant) -> list:
+    return [state for state in hass.states.async_all("media_player") if state.entity_id.startswith("media_player.amplipi")]
+
+
+async def open_breaker(hass: HomeAssistant, controller, coordinator) -> None:
+    # Registering the entities during setup has every model rebuilt by the next poll, get that out of the way first
+    await coordinator.async_refresh()
+    controller.error = ClientError("controller is down")
+    for _ in range(coordinator.breaker.threshold):
+        await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert coordinator.breaker.open
+    assert all(state.state == STATE_UNAVAILABLE for state in amplipi_states(hass))
+    controller.error = None
+
+
+async def test_entities_recover_when_breaker_closes_without_changes(hass: HomeAssistant, controller, coordinator):
+    assert amplipi_states(hass)
+    assert all(state.state != STATE_UNAVAILABLE for state in amplipi_states(hass))
+    await open_breaker(hass, controller, coordinator)
+
+    # The controller comes back with exactly the status it had before it went down
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert not coordinator.breaker.open
+    assert all(state.state != STATE_UNAVAILABLE for state in amplipi_states(hass))
+
+
+async def test_unchanged_entities_recover_when_breaker_closes(hass: HomeAssistant, controller, coordinator):
+    await open_breaker(hass, controller, coordinator)
+
+    # Only one source was renamed while the controller was down, every other entity has to come back as well
+    controller.status["sources"][1]["name"] = "Turntable"
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert not coordinator.breaker.open
+    assert all(state.state != STATE_UNAVAILABLE for state in amplipi_states(hass))
+
+
+async def test_first_live_poll_after_snapshot_writes_each_entity_once(hass: HomeAssistant, controller, config_entry):
+    # Setting the entry up saved a snapshot, reloading starts from it while the controller takes its time to answer
+    answer = asyncio.Event()
+    get_status = controller.get_status
+
+    async def slow_get_status():
+        await answer.wait()
+        return await get_status()
+
+    with patch.object(AmpliPi, "get_status", side_effect=slow_get_status):
+        await hass.config_entries.async_reload(config_entry.entry_id)
+        await hass.async_block_till_done()
+        assert amplipi_states(hass)
+        assert all(state.state == STATE_UNAVAILABLE for state in amplipi_states(hass))
+
+        writes = []
+        hass.bus.async_listen(EVENT_STATE_CHANGED, lambda event: writes.append(event.data["new_state"]))
+        controller.status["zones"][1].update(source_id=0, vol_f=0.9)
+        answer.set()
+        await hass.async_block_till_done(wait_background_tasks=True)
+
+    # Every entity comes back exactly once, the zone turned on in the meantime straight away with its live volume rather than the snapshot's
+    entity_ids = [state.entity_id for state in writes if state.entity_id.startswith("media_player.amplipi")]
+    assert sorted(entity_ids) == sorted(state.entity_id for state in amplipi_states(hass))
+    assert all(state.state != STATE_UNAVAILABLE for state in amplipi_states(hass))
+    assert 0.9 in [state.attributes.get("volume_level") for state in writes]
+
+
+async def test_set_zone_and_set_zones_for_the_same_zone_are_merged(hass: HomeAssistant, controller, coordinator):
+    await asyncio.gather(
+        coordinator.set_zone(1, ZoneUpdate(vol_f=0.3)),
+        coordinator.set_zones(MultiZoneUpdate(zones=[1, 2], update=ZoneUpdate(vol_f=0.6))),
+    )
+
+    # The later update wins on zone 1, leaving both zones with the same update to send together
+    assert [(call[0], sorted(call[1].zones), call[1].update.vol_f) for call in controller.calls] == [("set_zones", [1, 2], 0.6)]
+    assert [zone["vol_f"] for zone in controller.status["zones"][1:3]] == [0.6, 0.6]
+
+
+async def test_set_zone_waits_for_set_zones_in_flight_to_the_same_zone(hass: HomeAssistant, controller, coordinator):
+    # The first request is slow to answer, the one after it must still land last
+    requests = []
+
+    async def set_zones(update: MultiZoneUpdate):
+        requests.append(update)
+        if len(requests) == 1:
+            await asyncio.sleep(coordinator.coalescer.latency * 3)
+        return await controller.set_zones(update)
+
+    with patch.object(AmpliPi, "set_zones", side_effect=set_zones):
+        first = hass.async_create_task(coordinator.set_zones(MultiZoneUpdate(groups=[100], update=ZoneUpdate(vol_f=0.6))))
+        await asyncio.sleep(coordinator.coalescer.latency + 0.01)
+        await coordinator.set_zone(1, ZoneUpdate(vol_f=0.3))
+        await first
+
+    assert [call[1].update.vol_f for call in controller.calls] == [0.6, 0.3]
+    assert controller.status["zones"][1]["vol_f"] == 0.3
@@ -0,0 +1,33 @@
+"""Tests for the AmpliPi media player entities"""
+from unittest.mock import patch
+
+import pytest
+from aiohttp import ClientError
+from homeassistant.components.media_player import ATTR_INPUT_SOURCE, ATTR_MEDIA_VOLUME_LEVEL, DOMAIN as MEDIA_PLAYER_DOMAIN, SERVICE_SELECT_SOURCE, SERVICE_VOLUME_SET
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant
+from pyamplipi.amplipi import AmpliPi
+
+
+@pytest.mark.parametrize("entity_id", ["media_player.amplipi_zone_0", "media_player.amplipi_group_100"])
+async def test_failed_volume_change_leaves_coordinator_data_alone(hass: HomeAssistant, controller, coordinator, entity_id):
+    with patch.object(AmpliPi, "set_zones", side_effect=ClientError("controller is down")), pytest.raises(ClientError):
+        await hass.services.async_call(
+            MEDIA_PLAYER_DOMAIN, SERVICE_VOLUME_SET, {ATTR_ENTITY_ID: entity_id, ATTR_MEDIA_VOLUME_LEVEL: 0.7}, blocking=True
+        )
+
+    assert all(zone.vol_f == 0.0 for zone in coordinator.data.zones)
+    assert all(group.vol_f == 0.0 for group in coordinator.data.groups)
+
+
+async def test_zones_selecting_an_unconnected_stream_share_one_source(hass: HomeAssistant, controller, coordinator):
+    zones = ["media_player.amplipi_zone_0", "media_player.amplipi_zone_1", "media_player.amplipi_zone_2"]
+    await hass.services.async_call(
+        MEDIA_PLAYER_DOMAIN, SERVICE_SELECT_SOURCE, {ATTR_ENTITY_ID: zones, ATTR_INPUT_SOURCE: "media_player.amplipi_stream_1000"}, blocking=True
+    )
+
+    assert [call[0] for call in controller.calls] == ["set_source", "set_zones"]
+    _, source_id, update = controller.calls[0]
+    assert update.input == "stream=1000"
+    assert sorted(controller.calls[1][1].zones) == [0, 1, 2]
+    assert {zone["source_id"] for zone in controller.status["zones"][:3]} == {source_id}